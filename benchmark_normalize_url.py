@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for URL canonicalisation (crawlforai/url_canon.py).
+
+Replays the URLs from test_deduplication.py the way a crawl does: every
+asset reference on every page goes through normalize_url, so the same URLs
+recur constantly. Compares the previous parse_qs/urlencode implementation
+with the new one, both with a cold cache and a warm cache.
+
+    python benchmark_normalize_url.py [--pages=2000]
+"""
+
+import argparse
+import sys
+import timeit
+sys.path.append('crawlforai')
+
+from test_deduplication import FILENAME_URLS, NORMALIZATION_CASES
+from url_canon import cache_info, normalize_url
+
+
+def legacy_normalize_url(url):
+    """The runner's normalize_url before url_canon (for comparison)"""
+    from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
+
+    try:
+        parsed = urlparse(url)
+        dynamic_params = {
+            'v', 'version', 'timestamp', 'ts', 't', 'cache', 'cb', 'cachebuster',
+            '_', 'rand', 'random', 'time', 'nocache', 'bust', 'rev', 'r'
+        }
+        query_params = parse_qs(parsed.query, keep_blank_values=True)
+        filtered_params = {
+            key: value for key, value in query_params.items()
+            if key.lower() not in dynamic_params
+        }
+        new_query = urlencode(filtered_params, doseq=True)
+        return urlunparse((
+            parsed.scheme, parsed.netloc, parsed.path,
+            parsed.params, new_query, parsed.fragment
+        ))
+    except Exception:
+        return url
+
+
+def run(fn, urls):
+    for url in urls:
+        fn(url)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark normalize_url')
+    parser.add_argument('--pages', type=int, default=2000, help='Simulated pages, each referencing every test URL')
+    args = parser.parse_args()
+
+    page_urls = [u for pair in NORMALIZATION_CASES for u in pair] + FILENAME_URLS
+    workload = page_urls * args.pages
+
+    print("⏱️  normalize_url micro-benchmark")
+    print(f"   {len(workload):,} calls ({len(set(page_urls))} distinct URLs x {args.pages} pages)")
+
+    legacy = min(timeit.repeat(lambda: run(legacy_normalize_url, workload), number=1, repeat=3))
+
+    def cold():
+        normalize_url.cache_clear()
+        for url in page_urls:
+            normalize_url(url)
+    cold_time = min(timeit.repeat(cold, number=args.pages, repeat=3)) / args.pages
+
+    normalize_url.cache_clear()
+    warm = min(timeit.repeat(lambda: run(normalize_url, workload), number=1, repeat=3))
+
+    per_call = lambda seconds, calls: seconds / calls * 1e9
+    print(f"   legacy (parse_qs/urlencode): {legacy:.3f}s  ({per_call(legacy, len(workload)):.0f} ns/call)")
+    print(f"   url_canon, cold cache:       {per_call(cold_time, len(page_urls)):.0f} ns/call")
+    print(f"   url_canon, warm cache:       {warm:.3f}s  ({per_call(warm, len(workload)):.0f} ns/call)")
+    print(f"   🚀 {legacy / warm:.1f}x faster on the crawl workload")
+    print(f"   cache: {cache_info()['normalize_url']}")
+
+
+if __name__ == "__main__":
+    main()
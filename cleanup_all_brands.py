@@ -4,116 +4,294 @@ Cleanup script to remove duplicate assets from ALL brand directories.
 This will scan all brands and remove files with identical content.
 """
 
+import argparse
 import hashlib
+import json
 import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from collections import defaultdict
 
-def cleanup_duplicate_assets(brand_dir):
-    """Remove duplicate assets based on content hash for a single brand"""
-    
-    brand_name = brand_dir.name
+sys.path.append(str(Path(__file__).resolve().parent / 'crawlforai'))
+from url_set import UrlMap
+
+# Asset directories scanned per brand (relative to <brand>/assets)
+ASSET_SUBDIRS = ('', 'pdf', 'txt', 'other')
+# Bytes hashed from each end of a file before committing to a full hash
+PARTIAL_BLOCK = 64 * 1024
+DEFAULT_WORKERS = min(32, (os.cpu_count() or 4) * 4)
+
+
+def list_asset_files(brand_dir):
+    """(path, size) for every asset file of a brand, in scan order.
+
+    Hidden files (in-progress `.part` downloads) are skipped.
+    """
     assets_dir = brand_dir / 'assets'
-    
-    if not assets_dir.exists():
-        print(f"  ⚠️  No assets directory found for {brand_name}")
-        return 0, 0
-    
-    print(f"  🔍 Scanning {brand_name}...")
-    
-    # Track files by content hash
-    content_hashes = defaultdict(list)
-    total_files = 0
-    
-    # Scan all asset directories
-    for root_dir in [assets_dir, assets_dir / 'pdf', assets_dir / 'txt']:
+    files = []
+    for sub in ASSET_SUBDIRS:
+        root_dir = assets_dir / sub if sub else assets_dir
         if not root_dir.exists():
             continue
-            
         for file_path in root_dir.iterdir():
+            if file_path.name.startswith('.'):
+                continue
+            try:
+                st = file_path.stat()
+            except OSError:
+                continue
             if file_path.is_file():
-                total_files += 1
-                try:
-                    with open(file_path, 'rb') as f:
-                        content = f.read()
-                    content_hash = hashlib.md5(content).hexdigest()
-                    content_hashes[content_hash].append(file_path)
-                        
-                except Exception as e:
-                    print(f"    ⚠️  Error reading {file_path.name}: {e}")
-                    continue
-    
-    # Find and remove duplicates
-    duplicate_groups = {h: files for h, files in content_hashes.items() if len(files) > 1}
-    
+                files.append((file_path, st.st_size))
+    return files
+
+
+def partial_hash(path, size):
+    """MD5 of the first and last PARTIAL_BLOCK bytes (the whole file when it is small)"""
+    h = hashlib.md5()
+    with open(path, 'rb') as f:
+        h.update(f.read(PARTIAL_BLOCK))
+        if size > PARTIAL_BLOCK:
+            f.seek(max(PARTIAL_BLOCK, size - PARTIAL_BLOCK))
+            h.update(f.read(PARTIAL_BLOCK))
+    return h.hexdigest()
+
+
+def full_hash(path):
+    """Streaming MD5 of the whole file"""
+    h = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def refine_groups(groups, hash_fn, executor):
+    """Split each candidate group by hash_fn(path, size), hashing all groups' files in parallel.
+
+    Returns only the sub-groups that still hold more than one file, with
+    files kept in their original order. Unreadable files are reported and
+    dropped.
+    """
+    jobs = [(key, path, size) for key, files in groups.items() for path, size in files]
+
+    def run(job):
+        key, path, size = job
+        try:
+            return key, path, size, hash_fn(path, size)
+        except Exception as e:
+            print(f"    ⚠️  Error reading {path.name}: {e}")
+            return key, path, size, None
+
+    refined = defaultdict(list)
+    for key, path, size, digest in executor.map(run, jobs):
+        if digest is not None:
+            refined[key + (digest,)].append((path, size))
+    return {k: files for k, files in refined.items() if len(files) > 1}
+
+
+def find_duplicate_groups(brand_dirs, workers=DEFAULT_WORKERS):
+    """Find identical asset files within each brand, for all brands at once.
+
+    Files are bucketed by (brand, size); only colliding sizes are read. A
+    first/last-block hash then splits the buckets further, and a full
+    streaming hash confirms matches (skipped when the partial hash already
+    covered the whole file). Returns {brand_dir: [[path, ...], ...]}, each
+    group listed in scan order.
+    """
+    by_size = defaultdict(list)
+    for brand_dir in brand_dirs:
+        for path, size in list_asset_files(brand_dir):
+            by_size[(brand_dir, size)].append((path, size))
+    candidates = {k: files for k, files in by_size.items() if len(files) > 1}
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        candidates = refine_groups(candidates, partial_hash, executor)
+        small = {k: files for k, files in candidates.items() if k[1] <= 2 * PARTIAL_BLOCK}
+        large = {k: files for k, files in candidates.items() if k[1] > 2 * PARTIAL_BLOCK}
+        confirmed = dict(small)
+        confirmed.update(refine_groups(large, lambda path, size: full_hash(path), executor))
+
+    groups = defaultdict(list)
+    for key, files in confirmed.items():
+        groups[key[0]].append([path for path, _ in files])
+    return groups
+
+
+def cleanup_duplicate_assets(brand_dir, duplicate_groups=None, dry_run=False):
+    """Remove duplicate assets based on content hash for a single brand.
+
+    duplicate_groups comes from find_duplicate_groups; the brand is scanned on
+    its own when it is not given. With dry_run, only report what would go.
+    """
+
+    brand_name = brand_dir.name
+    assets_dir = brand_dir / 'assets'
+
+    if not assets_dir.exists():
+        print(f"  ⚠️  No assets directory found for {brand_name}")
+        return 0, 0
+
+    if duplicate_groups is None:
+        print(f"  🔍 Scanning {brand_name}...")
+        duplicate_groups = find_duplicate_groups([brand_dir]).get(brand_dir, [])
+
     if not duplicate_groups:
-        print(f"    ✅ {brand_name}: No duplicates found ({total_files} files)")
+        print(f"    ✅ {brand_name}: No duplicates found ({len(list_asset_files(brand_dir))} files)")
         return 0, 0
-    
+
     removed_count = 0
     saved_space = 0
-    
-    for content_hash, file_list in duplicate_groups.items():
+    groups = {}
+
+    for file_list in duplicate_groups:
         # Sort by modification time (keep the oldest/first one)
-        file_list.sort(key=lambda f: f.stat().st_mtime)
-        
+        file_list = sorted(file_list, key=lambda f: f.stat().st_mtime)
+        groups[file_list[0]] = file_list
+
         keep_file = file_list[0]
         duplicate_files = file_list[1:]
-        
+
         for duplicate_file in duplicate_files:
             try:
                 file_size = duplicate_file.stat().st_size
-                duplicate_file.unlink()
+                if dry_run:
+                    print(f"    would remove {duplicate_file.relative_to(brand_dir)} (same as {keep_file.relative_to(brand_dir)})")
+                else:
+                    duplicate_file.unlink()
                 removed_count += 1
                 saved_space += file_size
             except Exception as e:
                 print(f"    ⚠️  Failed to remove {duplicate_file.name}: {e}")
-    
+
+    if dry_run:
+        print(f"    🔎 {brand_name}: Would remove {removed_count} duplicates, saving {saved_space:,} bytes")
+        return removed_count, saved_space
+
     print(f"    🧹 {brand_name}: Removed {removed_count} duplicates, saved {saved_space:,} bytes")
-    
+
     # Update asset cache
-    update_asset_cache(brand_dir, duplicate_groups)
-    
+    update_asset_cache(brand_dir, groups)
+
     return removed_count, saved_space
 
+def duplicate_replacements(brand_dir, duplicate_groups):
+    """{removed path: kept path}, both relative to the brand ('assets/...'), for groups listed kept file first"""
+    replacements = {}
+    for file_list in duplicate_groups.values():
+        keep = file_list[0].relative_to(brand_dir).as_posix()
+        for removed in file_list[1:]:
+            replacements[removed.relative_to(brand_dir).as_posix()] = keep
+    return replacements
+
+# Local asset links as the runner writes them: ./assets/<name>, ./assets/pdf/<name>, ...
+ASSET_LINK_RE = re.compile(r'\./(assets/[^\s)"\'\]<>]+)')
+
+def rewrite_page_links(brand_dir, replacements):
+    """Point markdown links at removed duplicates to the kept files; returns {page file: new text}"""
+    rewritten = {}
+    for md_path in brand_dir.glob('*.md'):
+        try:
+            text = md_path.read_text(encoding='utf-8')
+        except OSError:
+            continue
+        if './assets/' not in text:
+            continue
+        new_text = ASSET_LINK_RE.sub(lambda m: './' + replacements.get(m.group(1), m.group(1)), text)
+        if new_text == text:
+            continue
+        tmp = md_path.with_name(md_path.name + '.tmp')
+        tmp.write_text(new_text, encoding='utf-8')
+        os.replace(tmp, md_path)
+        rewritten[md_path.name] = new_text
+    return rewritten
+
+def update_manifest_content(brand_dir, rewritten):
+    """Refresh the size/sha256 the crawl manifest records for pages whose text changed"""
+    manifest_file = brand_dir / '.crawl_manifest.json'
+    try:
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return
+    changed = False
+    for rec in manifest.get('pages', {}).values():
+        text = rewritten.get(rec.get('file'))
+        if text is None or 'sha256' not in rec:
+            continue
+        rec['size'] = (brand_dir / rec['file']).stat().st_size
+        rec['sha256'] = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        changed = True
+    if changed:
+        tmp = manifest_file.with_name(manifest_file.name + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, manifest_file)
+
 def update_asset_cache(brand_dir, duplicate_groups):
-    """Update asset cache to remove references to deleted duplicate files"""
-    
-    cache_file = brand_dir / '.asset_cache.json'
-    if not cache_file.exists():
+    """Point the asset cache and page links at the kept file of each duplicate group.
+
+    duplicate_groups maps any key to a group's files, kept file first. Cache
+    entries of removed files are remapped rather than dropped, so the next
+    crawl still finds those URLs on disk.
+    """
+    brand_dir = Path(brand_dir)
+    replacements = duplicate_replacements(brand_dir, duplicate_groups)
+    if not replacements:
         return
-    
+
+    cache_file = brand_dir / '.asset_cache.json'
+    if cache_file.exists():
+        try:
+            with open(cache_file, 'r') as f:
+                cache = json.load(f)
+
+            remapped = 0
+            for url, path in cache.items():
+                if not path:
+                    continue
+                # The runner records './assets/...'; keep whichever prefix the entry uses
+                prefix = './' if path.startswith('./') else ''
+                keep = replacements.get(path[len(prefix):])
+                if keep:
+                    cache[url] = prefix + keep
+                    remapped += 1
+
+            tmp = cache_file.with_name(cache_file.name + '.tmp')
+            with open(tmp, 'w') as f:
+                json.dump(cache, f, indent=2)
+            os.replace(tmp, cache_file)
+
+            if remapped > 0:
+                print(f"    📝 Updated asset cache: {remapped} entries now point at the kept files")
+        except Exception as e:
+            print(f"    ⚠️  Failed to update asset cache: {e}")
+
+    # Binary cache written by the runner's --compactCache: paths are stored once, so remap that table
+    compact_file = brand_dir / '.asset_cache.bin'
+    if compact_file.exists():
+        try:
+            cache = UrlMap.load(compact_file)
+            mapping = {}
+            for removed, keep in replacements.items():
+                mapping[removed] = keep
+                mapping['./' + removed] = './' + keep
+            remapped = cache.remap_values(mapping)
+            cache.save(compact_file)
+            if remapped > 0:
+                print(f"    📝 Updated compact asset cache: {remapped} entries now point at the kept files")
+        except Exception as e:
+            print(f"    ⚠️  Failed to update compact asset cache: {e}")
+
     try:
-        import json
-        
-        with open(cache_file, 'r') as f:
-            cache = json.load(f)
-        
-        # Get list of all removed files
-        removed_files = []
-        for file_list in duplicate_groups.values():
-            removed_files.extend([f.name for f in file_list[1:]])  # Skip the first (kept) file
-        
-        # Remove cache entries for deleted files
-        updated_cache = {}
-        removed_entries = 0
-        
-        for url, path in cache.items():
-            filename = path.split('/')[-1]  # Extract filename from path
-            if filename not in removed_files:
-                updated_cache[url] = path
-            else:
-                removed_entries += 1
-        
-        # Save updated cache
-        with open(cache_file, 'w') as f:
-            json.dump(updated_cache, f, indent=2)
-        
-        if removed_entries > 0:
-            print(f"    📝 Updated asset cache: removed {removed_entries} entries")
-    
+        rewritten = rewrite_page_links(brand_dir, replacements)
+        update_manifest_content(brand_dir, rewritten)
+        if rewritten:
+            print(f"    🔗 Rewrote asset links in {len(rewritten)} pages")
     except Exception as e:
-        print(f"    ⚠️  Failed to update asset cache: {e}")
+        print(f"    ⚠️  Failed to rewrite page links: {e}")
 
 def get_brand_summary(brand_dir):
     """Get summary statistics for a brand"""
@@ -122,6 +300,7 @@ def get_brand_summary(brand_dir):
     if not assets_dir.exists():
         return 0, 0, 0, 0
     
+    # Count the files on disk: the crawl manifest may not record every page (legacy trees, failed renders)
     pages = len(list(brand_dir.glob('*.md')))
     images = len(list(assets_dir.glob('*'))) if assets_dir.exists() else 0
     pdfs = len(list((assets_dir / 'pdf').glob('*.pdf'))) if (assets_dir / 'pdf').exists() else 0
@@ -137,6 +316,12 @@ def get_brand_summary(brand_dir):
 
 def main():
     """Main cleanup function for all brands"""
+
+    parser = argparse.ArgumentParser(description='Remove duplicate assets from all brand directories')
+    parser.add_argument('--dry-run', action='store_true', help='Report duplicates without deleting anything')
+    parser.add_argument('-y', '--yes', action='store_true', help='Do not ask for confirmation (for scripts/cron)')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Threads used for hashing')
+    args = parser.parse_args()
     
     output_dir = Path("crawlforai/output_markdown")
     
@@ -149,7 +334,7 @@ def main():
     print("=" * 60)
     
     # Get all brand directories
-    brand_dirs = [d for d in output_dir.iterdir() if d.is_dir()]
+    brand_dirs = [d for d in output_dir.iterdir() if d.is_dir() and not d.name.startswith('_')]
     
     if not brand_dirs:
         print("No brand directories found.")
@@ -175,22 +360,30 @@ def main():
     print(f"\n📈 Totals: {total_pages} pages, {total_images} images, {total_pdfs} PDFs, {total_txts} TXT files")
     
     # Ask for confirmation
-    response = input(f"\nClean up duplicates in ALL {len(brand_dirs)} brands? (y/N): ").strip().lower()
-    if response != 'y':
-        print("Cleanup cancelled.")
-        return
+    if not (args.yes or args.dry_run):
+        response = input(f"\nClean up duplicates in ALL {len(brand_dirs)} brands? (y/N): ").strip().lower()
+        if response != 'y':
+            print("Cleanup cancelled.")
+            return
     
-    print("\n🚀 Starting cleanup...")
+    print("\n🔍 Scanning all brands..." if args.dry_run else "\n🚀 Starting cleanup...")
+    started = time.monotonic()
+    duplicate_groups = find_duplicate_groups(brand_dirs, workers=args.workers)
+    print(f"   Scanned in {time.monotonic() - started:.1f}s")
     
     # Clean up each brand
     total_removed = 0
     total_saved = 0
     
     for brand_dir in brand_dirs:
-        removed, saved = cleanup_duplicate_assets(brand_dir)
+        removed, saved = cleanup_duplicate_assets(brand_dir, duplicate_groups.get(brand_dir, []), dry_run=args.dry_run)
         total_removed += removed
         total_saved += saved
     
+    if args.dry_run:
+        print(f"\n🔎 Dry run: {total_removed} files would be removed, saving {total_saved:,} bytes ({total_saved/1024/1024:.1f} MB)")
+        return
+    
     print(f"\n🎉 Cleanup Complete!")
     print(f"   Total files removed: {total_removed}")
     print(f"   Total space saved: {total_saved:,} bytes ({total_saved/1024/1024:.1f} MB)")
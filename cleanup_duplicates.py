@@ -9,6 +9,8 @@ import os
 from pathlib import Path
 from collections import defaultdict
 
+from cleanup_all_brands import update_asset_cache
+
 def cleanup_duplicate_assets(brand_dir):
     """Remove duplicate assets based on content hash"""
     
@@ -85,48 +87,9 @@ def cleanup_duplicate_assets(brand_dir):
     print(f"   Removed: {removed_count} duplicate files")
     print(f"   Saved space: {saved_space:,} bytes ({saved_space/1024/1024:.1f} MB)")
     
-    # Update asset cache to remove references to deleted files
+    # Point the asset cache and page links at the kept files
     update_asset_cache(brand_dir, duplicate_groups)
 
-def update_asset_cache(brand_dir, duplicate_groups):
-    """Update asset cache to remove references to deleted duplicate files"""
-    
-    cache_file = Path(brand_dir) / '.asset_cache.json'
-    if not cache_file.exists():
-        return
-    
-    try:
-        import json
-        
-        with open(cache_file, 'r') as f:
-            cache = json.load(f)
-        
-        # Get list of all removed files
-        removed_files = []
-        for file_list in duplicate_groups.values():
-            removed_files.extend([f.name for f in file_list[1:]])  # Skip the first (kept) file
-        
-        # Remove cache entries for deleted files
-        updated_cache = {}
-        removed_entries = 0
-        
-        for url, path in cache.items():
-            filename = path.split('/')[-1]  # Extract filename from path
-            if filename not in removed_files:
-                updated_cache[url] = path
-            else:
-                removed_entries += 1
-        
-        # Save updated cache
-        with open(cache_file, 'w') as f:
-            json.dump(updated_cache, f, indent=2)
-        
-        if removed_entries > 0:
-            print(f"📝 Updated asset cache: removed {removed_entries} entries for deleted files")
-    
-    except Exception as e:
-        print(f"⚠️  Failed to update asset cache: {e}")
-
 def main():
     """Main cleanup function"""
     
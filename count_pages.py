@@ -6,8 +6,9 @@ total = 0
 for brand in brands:
     brand_dir = f"crawlforai/output_markdown/{brand}"
     if os.path.exists(brand_dir):
-        md_files = [f for f in os.listdir(brand_dir) if f.endswith('.md')]
-        count = len(md_files)
+        # Every page on disk, including ones the crawl manifest does not record
+        # (trees crawled before it existed, failed renders, interrupted runs)
+        count = len([f for f in os.listdir(brand_dir) if f.endswith('.md')])
         print(f"{brand}: {count} pages")
         total += count
 
@@ -1,9 +1,15 @@
 import argparse
 import glob
+import hashlib
 import json
 import os
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from typing import List, Tuple
 
+from capture_store import capture_url
+
 try:
   from crawl4ai.content_filter_strategy import PruningContentFilter, BM25ContentFilter  # type: ignore
 except Exception as e:
@@ -13,30 +19,36 @@ ROOT = os.path.dirname(__file__)
 
 
 def read_markdown_and_url(md_path: str) -> Tuple[str, str]:
-  """Return (markdown, url_if_known) by looking for a sibling .capture.json file."""
+  """Return (markdown, url_if_known) from the brand's capture index or a sibling .capture.json file."""
   md = ''
   try:
     with open(md_path, 'r', encoding='utf-8') as f:
       md = f.read()
   except Exception:
     pass
-  url = ''
-  cap_path = md_path.replace('.md', '.capture.json')
-  if os.path.exists(cap_path):
-    try:
-      with open(cap_path, 'r', encoding='utf-8') as f:
-        cap = json.load(f)
-        url = cap.get('url', '') or ''
-    except Exception:
-      url = ''
+  url = capture_url(os.path.dirname(md_path), os.path.basename(md_path))
   return md, url
 
 
+def make_filters(prune_threshold: float | None, prune_min_words: int | None, bm25_query: str | None, bm25_threshold: float | None):
+  """Build the (pruning, bm25) filters once; either may be None when not configured."""
+  pf = None
+  if prune_threshold is not None:
+    pf = PruningContentFilter(threshold=prune_threshold, min_word_threshold=(prune_min_words or 0))
+  bf = None
+  if bm25_query:
+    bf = BM25ContentFilter(user_query=bm25_query, bm25_threshold=(bm25_threshold or 0.0))
+  return pf, bf
+
+
 def apply_filters(text: str, prune_threshold: float | None, prune_min_words: int | None, bm25_query: str | None, bm25_threshold: float | None) -> str:
+  return filter_text(text, *make_filters(prune_threshold, prune_min_words, bm25_query, bm25_threshold))
+
+
+def filter_text(text: str, pf, bf) -> str:
   chunks: List[str] = [text]
   # Prune first (if configured)
-  if prune_threshold is not None:
-    pf = PruningContentFilter(threshold=prune_threshold, min_word_threshold=(prune_min_words or 0))
+  if pf is not None:
     pruned = []
     for ch in chunks:
       try:
@@ -45,8 +57,7 @@ def apply_filters(text: str, prune_threshold: float | None, prune_min_words: int
         pruned.append(ch)
     chunks = pruned if pruned else chunks
   # BM25 on the output (if configured)
-  if bm25_query:
-    bf = BM25ContentFilter(user_query=bm25_query, bm25_threshold=(bm25_threshold or 0.0))
+  if bf is not None:
     scored = []
     for ch in chunks:
       try:
@@ -57,21 +68,55 @@ def apply_filters(text: str, prune_threshold: float | None, prune_min_words: int
   return "\n\n---\n\n".join(chunks)
 
 
-def aggregate_brand(brand_slug: str, *, bm25_query: str | None, bm25_threshold: float | None, prune_threshold: float | None, prune_min_words: int | None) -> str:
+# Filters built once per worker process, keyed by their parameters
+_worker_filters: dict = {}
+
+
+def filter_batch(text: str, filter_args: tuple) -> str:
+  """Process-pool entry point: filter one batch of pages with (prune, minWords, bm25, bm25Threshold)."""
+  filters = _worker_filters.get(filter_args)
+  if filters is None:
+    filters = _worker_filters[filter_args] = make_filters(*filter_args)
+  return filter_text(text, *filters)
+
+
+def page_section(md_path: str) -> str:
+  """One page's markdown with its '### Page:' header ('' if empty/unreadable)."""
+  md, url = read_markdown_and_url(md_path)
+  if not md:
+    return ''
+  header = f"### Page: {url}\n\n" if url else ''
+  return header + md
+
+
+def aggregate_brand(brand_slug: str, *, bm25_query: str | None, bm25_threshold: float | None, prune_threshold: float | None, prune_min_words: int | None, stream: bool = False, batch_pages: int = 1, pool: Executor | None = None, pool_window: int = 8, incremental: bool = False) -> str:
   in_dir = os.path.join(ROOT, 'output_markdown', brand_slug)
   out_dir = os.path.join(ROOT, 'output_markdown', '_aggregated')
   os.makedirs(out_dir, exist_ok=True)
   md_files = sorted(glob.glob(os.path.join(in_dir, '*.md')))
   if not md_files:
     return ''
+  filter_args = (prune_threshold, prune_min_words, bm25_query, bm25_threshold)
+  cache = None
+  if incremental:
+    # Fragments are per page, so incremental runs always stream
+    stream = True
+    cache = FragmentCache(os.path.join(out_dir, '.cache', brand_slug), filter_args)
+  if stream:
+    return aggregate_brand_streaming(
+      brand_slug, md_files, out_dir,
+      filter_args=filter_args,
+      batch_pages=batch_pages,
+      pool=pool,
+      pool_window=pool_window,
+      cache=cache,
+    )
 
   parts: List[str] = []
   for p in md_files:
-    md, url = read_markdown_and_url(p)
-    if not md:
-      continue
-    header = f"### Page: {url}\n\n" if url else ''
-    parts.append(header + md)
+    section = page_section(p)
+    if section:
+      parts.append(section)
 
   aggregated = "\n\n\n".join(parts)
   filtered = apply_filters(aggregated, prune_threshold, prune_min_words, bm25_query, bm25_threshold)
@@ -81,6 +126,139 @@ def aggregate_brand(brand_slug: str, *, bm25_query: str | None, bm25_threshold:
   return out_path
 
 
+class FragmentCache:
+  """Filtered page output on disk, one file per (page content, filter parameters).
+
+  Lives in `_aggregated/.cache/<brand>/`. A rerun only filters pages whose
+  text (or the filter settings) changed; `prune` drops fragments the last run
+  did not use.
+  """
+
+  def __init__(self, cache_dir: str, filter_args: tuple):
+    self.dir = cache_dir
+    os.makedirs(cache_dir, exist_ok=True)
+    self.params = json.dumps(list(filter_args))
+    self.used = set()
+    self.hits = 0
+    self.misses = 0
+
+  def key(self, text: str) -> str:
+    return hashlib.sha256(f"{self.params}\0{text}".encode('utf-8')).hexdigest()
+
+  def get(self, key: str) -> str | None:
+    self.used.add(key)
+    try:
+      with open(os.path.join(self.dir, key + '.md'), 'r', encoding='utf-8') as f:
+        text = f.read()
+    except OSError:
+      self.misses += 1
+      return None
+    self.hits += 1
+    return text
+
+  def put(self, key: str, text: str):
+    path = os.path.join(self.dir, key + '.md')
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+      f.write(text)
+    os.replace(path + '.tmp', path)
+
+  def prune(self):
+    for name in os.listdir(self.dir):
+      if name[:-3] not in self.used:
+        try:
+          os.remove(os.path.join(self.dir, name))
+        except OSError:
+          pass
+
+
+def aggregate_brand_streaming(brand_slug: str, md_files: List[str], out_dir: str, *, filter_args: tuple, batch_pages: int, pool: Executor | None = None, pool_window: int = 8, cache: FragmentCache | None = None) -> str:
+  """Filter `batch_pages` pages at a time and append each result to the output.
+
+  Only one batch is held in memory, so peak memory no longer grows with the
+  brand. Filters score each batch on its own (BM25 statistics are per batch,
+  not per brand). Without filters the output is identical to the in-memory
+  mode. The file is written to a temp name and moved into place at the end.
+
+  With a process `pool`, up to `pool_window` batches are filtered in
+  parallel; results are still written in page order, so the output matches
+  a sequential run. With a FragmentCache, batches are single pages and
+  unchanged pages reuse their cached filtered output.
+  """
+  pf, bf = make_filters(*filter_args)
+  filtering = pf is not None or bf is not None
+  if not filtering:
+    pool = None
+    cache = None
+  if cache is not None:
+    batch_pages = 1
+  window = max(1, pool_window) if pool is not None else 1
+  # (cache key to store the result under, filtered text or Future), in page order
+  pending: deque = deque()
+  # Filtered output is a list of chunks, joined the same way apply_filters joins them
+  joiner = "\n\n---\n\n" if filtering else "\n\n\n"
+  out_path = os.path.join(out_dir, f"{brand_slug}.md")
+  tmp_path = out_path + '.tmp'
+  wrote_any = False
+  batch: List[str] = []
+
+  def write(f, key: str | None, value):
+    nonlocal wrote_any
+    text = value.result() if isinstance(value, Future) else value
+    if key is not None:
+      cache.put(key, text)
+    if wrote_any:
+      f.write(joiner)
+    f.write(text)
+    wrote_any = True
+
+  def drain(f, keep: int):
+    # Keep fewer than `keep` batches in flight; write the oldest first
+    while len(pending) >= keep:
+      write(f, *pending.popleft())
+
+  def flush(f):
+    if not batch:
+      return
+    text = "\n\n\n".join(batch)
+    batch.clear()
+    key = None
+    if cache is not None:
+      key = cache.key(text)
+      cached = cache.get(key)
+      if cached is not None:
+        pending.append((None, cached))
+        drain(f, window)
+        return
+    if pool is not None:
+      pending.append((key, pool.submit(filter_batch, text, filter_args)))
+    else:
+      pending.append((key, filter_text(text, pf, bf) if filtering else text))
+    drain(f, window)
+
+  with open(tmp_path, 'w', encoding='utf-8') as f:
+    for p in md_files:
+      section = page_section(p)
+      if not section:
+        continue
+      batch.append(section)
+      if len(batch) >= max(1, batch_pages):
+        flush(f)
+    flush(f)
+    drain(f, 1)
+  os.replace(tmp_path, out_path)
+  if cache is not None:
+    cache.prune()
+    print(f"[{brand_slug}] Fragment cache: {cache.hits} reused, {cache.misses} filtered", flush=True)
+  return out_path
+
+
+def timed_aggregate(slug: str, options: dict) -> Tuple[str, str, float]:
+  """aggregate_brand plus its wall time; top-level so process pools can pickle it."""
+  started = time.monotonic()
+  out = aggregate_brand(slug, **options)
+  return slug, out, time.monotonic() - started
+
+
 def main():
   parser = argparse.ArgumentParser(description='Aggregate crawled markdown per brand and optionally apply pruning/BM25 filters')
   parser.add_argument('--brand', help='Single brand slug to aggregate (default: all under output_markdown)')
@@ -88,6 +266,10 @@ def main():
   parser.add_argument('--bm25Threshold', type=float, default=None, help='BM25 score threshold (e.g., 1.2)')
   parser.add_argument('--prune', dest='prune_threshold', type=float, default=None, help='Pruning threshold (e.g., 0.5)')
   parser.add_argument('--minWords', dest='prune_min_words', type=int, default=None, help='Minimum words for pruning (e.g., 50)')
+  parser.add_argument('--stream', action='store_true', help='Filter and write page by page (flat memory; BM25 scores each batch separately)')
+  parser.add_argument('--batchPages', type=int, default=1, help='Pages filtered together per batch with --stream')
+  parser.add_argument('--incremental', action='store_true', help='Reuse cached filtered output for unchanged pages (implies --stream, one page per batch)')
+  parser.add_argument('--jobs', type=int, default=1, help='Worker processes: brands in parallel (and page batches too with --stream)')
   args = parser.parse_args()
 
   base = os.path.join(ROOT, 'output_markdown')
@@ -96,20 +278,43 @@ def main():
   else:
     slugs = [d for d in os.listdir(base) if os.path.isdir(os.path.join(base, d)) and not d.startswith('_')]
 
+  options = dict(
+    bm25_query=args.bm25_query,
+    bm25_threshold=args.bm25Threshold,
+    prune_threshold=args.prune_threshold,
+    prune_min_words=args.prune_min_words,
+    stream=args.stream,
+    batch_pages=args.batchPages,
+    incremental=args.incremental,
+  )
+  jobs = max(1, args.jobs)
+  started = time.monotonic()
   results = []
-  for slug in slugs:
-    out = aggregate_brand(
-      slug,
-      bm25_query=args.bm25_query,
-      bm25_threshold=args.bm25Threshold,
-      prune_threshold=args.prune_threshold,
-      prune_min_words=args.prune_min_words,
-    )
+
+  def report(slug: str, out: str, seconds: float):
     if out:
       results.append((slug, out))
-      print(f"[{slug}] Aggregated -> {out}")
+      print(f"[{slug}] Aggregated -> {out} ({seconds:.1f}s)", flush=True)
     else:
-      print(f"[{slug}] No markdown files found to aggregate.")
+      print(f"[{slug}] No markdown files found to aggregate.", flush=True)
+
+  if jobs == 1:
+    for slug in slugs:
+      report(*timed_aggregate(slug, options))
+  elif args.stream or args.incremental:
+    # Brands on threads (file I/O), their page batches on one shared process pool
+    with ProcessPoolExecutor(max_workers=jobs) as procs, ThreadPoolExecutor(max_workers=jobs) as threads:
+      futures = [threads.submit(timed_aggregate, slug, dict(options, pool=procs, pool_window=2 * jobs)) for slug in slugs]
+      for fut in as_completed(futures):
+        report(*fut.result())
+  else:
+    with ProcessPoolExecutor(max_workers=jobs) as procs:
+      futures = [procs.submit(timed_aggregate, slug, options) for slug in slugs]
+      for fut in as_completed(futures):
+        report(*fut.result())
+
+  if len(slugs) > 1:
+    print(f"Aggregated {len(results)}/{len(slugs)} brands in {time.monotonic() - started:.1f}s")
 
   if not results:
     print('No aggregates produced.')
@@ -0,0 +1,215 @@
+"""Cross-brand content-addressed asset store.
+
+Blobs live once in output_markdown/_blobs/objects/<sha[:2]>/<sha256>; brand
+asset files are hard links to them. The link count of a blob is its
+reference count: a blob whose only link is the store itself is garbage.
+_blobs/urls.jsonl maps normalised asset URLs to (sha256, kind), so the
+runner (--sharedAssets) can link an asset some brand already has without
+touching the network.
+
+Where hard links are not possible (another filesystem, no permission) the
+brand keeps its own copy and nothing breaks.
+
+  python blob_store.py adopt [--brand=<slug>]   # link existing brand assets into the store
+  python blob_store.py gc [--dry-run]           # drop unreferenced blobs (run when no crawl is active)
+  python blob_store.py stats
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+ROOT = os.path.dirname(__file__)
+
+STORE_DIR = '_blobs'
+
+# Asset subdirectory -> kind, as laid out by the runner's asset_destination
+SUBDIR_KINDS = {'': 'image', 'pdf': 'pdf', 'txt': 'txt', 'other': 'other'}
+
+
+def hash_file(path) -> str:
+  h = hashlib.sha256()
+  with open(path, 'rb') as f:
+    for chunk in iter(lambda: f.read(1024 * 1024), b''):
+      h.update(chunk)
+  return h.hexdigest()
+
+
+class BlobStore:
+  """Blob directory plus the URL -> (sha256, kind) log; one instance per store root per process"""
+
+  _open: Dict[str, 'BlobStore'] = {}
+
+  def __init__(self, root):
+    self.root = Path(root)
+    self.objects = self.root / 'objects'
+    self.objects.mkdir(parents=True, exist_ok=True)
+    self.url_log = self.root / 'urls.jsonl'
+    self.urls: Dict[str, Tuple[str, str]] = {}
+    self._lock = threading.Lock()
+    if self.url_log.exists():
+      with open(self.url_log, 'r', encoding='utf-8') as f:
+        for line in f:
+          try:
+            entry = json.loads(line)
+          except ValueError:
+            continue
+          self.urls[entry['url']] = (entry['sha256'], entry['kind'])
+
+  @classmethod
+  def open(cls, root) -> 'BlobStore':
+    key = str(Path(root).resolve())
+    if key not in cls._open:
+      cls._open[key] = cls(root)
+    return cls._open[key]
+
+  def blob_path(self, sha: str) -> Path:
+    return self.objects / sha[:2] / sha
+
+  def lookup_url(self, url: str) -> Optional[Tuple[str, str]]:
+    """(sha256, kind) of a URL some brand already downloaded, if its blob is still stored"""
+    entry = self.urls.get(url)
+    if entry and self.blob_path(entry[0]).exists():
+      return entry
+    return None
+
+  def remember_url(self, url: str, sha: str, kind: str):
+    with self._lock:
+      if self.urls.get(url) == (sha, kind):
+        return
+      self.urls[url] = (sha, kind)
+      with open(self.url_log, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({'url': url, 'sha256': sha, 'kind': kind}) + '\n')
+
+  def link_into(self, sha: str, dest: Path) -> bool:
+    """Hard-link a stored blob to dest (which must not exist); False if that is not possible"""
+    try:
+      os.link(self.blob_path(sha), dest)
+      return True
+    except OSError:
+      return False
+
+  def adopt(self, path: Path, sha: str) -> bool:
+    """Make a brand file share the blob for its content.
+
+    If the blob exists, the file is atomically replaced by a link to it;
+    otherwise the file becomes the blob (linked into the store). Returns
+    False when hard links are not available.
+    """
+    blob = self.blob_path(sha)
+    try:
+      if blob.exists():
+        if os.path.samefile(blob, path):
+          return True
+        tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.link")
+        os.link(blob, tmp)
+        os.replace(tmp, path)
+        return True
+      blob.parent.mkdir(exist_ok=True)
+      os.link(path, blob)
+      return True
+    except OSError:
+      return False
+
+  def gc(self, *, dry_run: bool = False) -> Tuple[int, int]:
+    """Remove blobs no brand links to any more and compact the URL log; returns (blobs, bytes)"""
+    removed = freed = 0
+    for shard in self.objects.iterdir():
+      if not shard.is_dir():
+        continue
+      for blob in shard.iterdir():
+        st = blob.stat()
+        if st.st_nlink > 1:
+          continue
+        removed += 1
+        freed += st.st_size
+        if not dry_run:
+          blob.unlink()
+    if not dry_run:
+      with self._lock:
+        self.urls = {u: e for u, e in self.urls.items() if self.blob_path(e[0]).exists()}
+        tmp = self.url_log.with_name(self.url_log.name + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+          for url, (sha, kind) in self.urls.items():
+            f.write(json.dumps({'url': url, 'sha256': sha, 'kind': kind}) + '\n')
+        os.replace(tmp, self.url_log)
+    return removed, freed
+
+  def stats(self) -> dict:
+    blobs = refs = stored = saved = 0
+    for shard in self.objects.iterdir():
+      if not shard.is_dir():
+        continue
+      for blob in shard.iterdir():
+        st = blob.stat()
+        blobs += 1
+        stored += st.st_size
+        refs += st.st_nlink - 1
+        saved += st.st_size * max(0, st.st_nlink - 2)
+    return {'blobs': blobs, 'references': refs, 'bytes': stored, 'bytes_saved': saved, 'urls': len(self.urls)}
+
+
+def adopt_brand(store: BlobStore, brand_dir: Path) -> Tuple[int, int]:
+  """Link a brand's existing assets into the store and record their URLs; returns (files, shared)"""
+  assets_dir = brand_dir / 'assets'
+  path_hashes: Dict[str, Tuple[str, str]] = {}
+  files = shared = 0
+  for sub, kind in SUBDIR_KINDS.items():
+    root_dir = assets_dir / sub if sub else assets_dir
+    if not root_dir.exists():
+      continue
+    for path in root_dir.iterdir():
+      if path.name.startswith('.') or not path.is_file():
+        continue
+      sha = hash_file(path)
+      blob = store.blob_path(sha)
+      existed = blob.exists() and not os.path.samefile(blob, path)
+      if store.adopt(path, sha):
+        files += 1
+        shared += existed
+      path_hashes[path.relative_to(brand_dir).as_posix()] = (sha, kind)
+  # The brand's URL cache tells us which URLs those files came from
+  try:
+    with open(brand_dir / '.asset_cache.json', 'r', encoding='utf-8') as f:
+      cache = json.load(f)
+  except (OSError, ValueError):
+    cache = {}
+  for url, rel in cache.items():
+    entry = path_hashes.get(str(rel).removeprefix('./')) if rel else None
+    if entry:
+      store.remember_url(url, *entry)
+  return files, shared
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Manage the cross-brand content-addressed asset store')
+  sub = parser.add_subparsers(dest='command', required=True)
+  adopt = sub.add_parser('adopt', help='Hard-link existing brand assets into the store')
+  adopt.add_argument('--brand', help='Single brand slug (default: all under output_markdown)')
+  gc = sub.add_parser('gc', help='Delete blobs that no brand links to')
+  gc.add_argument('--dry-run', action='store_true', help='Only report what would be deleted')
+  sub.add_parser('stats', help='Blob count, references and space saved')
+  args = parser.parse_args()
+
+  base = Path(ROOT) / 'output_markdown'
+  store = BlobStore.open(base / STORE_DIR)
+  if args.command == 'adopt':
+    slugs = [args.brand] if args.brand else [d.name for d in base.iterdir() if d.is_dir() and not d.name.startswith('_')]
+    for slug in slugs:
+      files, shared = adopt_brand(store, base / slug)
+      print(f"[{slug}] Linked {files} assets into the store ({shared} already held by another brand)")
+  elif args.command == 'gc':
+    removed, freed = store.gc(dry_run=args.dry_run)
+    verb = 'Would remove' if args.dry_run else 'Removed'
+    print(f"{verb} {removed} unreferenced blobs ({freed:,} bytes)")
+  else:
+    s = store.stats()
+    print(f"{s['blobs']} blobs, {s['references']} brand references, {s['bytes']:,} bytes stored, {s['bytes_saved']:,} bytes saved, {s['urls']} URLs")
+
+
+if __name__ == '__main__':
+  main()
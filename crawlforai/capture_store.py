@@ -0,0 +1,221 @@
+"""Compressed per-brand store for network/console captures.
+
+Instead of one pretty-printed `<page>.capture.json` per page, captures can be
+appended to a single per-brand stream:
+
+  output_markdown/<brand>/.captures/captures.log.gz   one gzip member per page (one JSON record each)
+  output_markdown/<brand>/.captures/index.jsonl       one small line per page: file, url, offset, length, counts
+
+The log is a valid multi-member gzip file, so `gzip.open` reads it end to end,
+but every page can also be inflated on its own from its (offset, length).
+Readers that only need a page's URL or counts read the index and never touch
+the log. Records are append-only; the last entry for a file wins.
+
+Recrawls leave superseded records behind, so opening a store for a crawl
+compacts it once they make up COMPACT_RATIO of the log: the newest member of
+each page is copied (still compressed) into a fresh log and index.
+
+Migrate or compact existing trees with:
+  python capture_store.py migrate [--brand=<slug>] [--delete]
+  python capture_store.py compact [--brand=<slug>]
+"""
+import argparse
+import gzip
+import json
+import os
+import threading
+from typing import Dict, Optional
+
+ROOT = os.path.dirname(__file__)
+
+STORE_DIR = '.captures'
+LOG_NAME = 'captures.log.gz'
+INDEX_NAME = 'index.jsonl'
+# Share of the log held by superseded records at which opening a store compacts it
+COMPACT_RATIO = 0.5
+
+
+def store_paths(brand_dir: str):
+  base = os.path.join(brand_dir, STORE_DIR)
+  return base, os.path.join(base, LOG_NAME), os.path.join(base, INDEX_NAME)
+
+
+class CaptureStore:
+  """Appender for one brand's capture stream (thread-safe; used by the PageWriter threads)"""
+
+  def __init__(self, brand_dir: str):
+    self.base, self.log_path, self.index_path = store_paths(brand_dir)
+    os.makedirs(self.base, exist_ok=True)
+    self._lock = threading.Lock()
+    compact_brand(brand_dir)
+
+  def append(self, fname: str, record_json: str, *, url: str, requests: int, console: int) -> dict:
+    """Append one page's capture (already serialised JSON) and its index line"""
+    member = gzip.compress(record_json.encode('utf-8'), compresslevel=6)
+    with self._lock:
+      with open(self.log_path, 'ab') as log:
+        offset = log.tell()
+        log.write(member)
+      entry = {
+        'file': fname,
+        'url': url,
+        'offset': offset,
+        'length': len(member),
+        'size': len(record_json),
+        'requests': requests,
+        'console': console,
+      }
+      with open(self.index_path, 'a', encoding='utf-8') as idx:
+        idx.write(json.dumps(entry) + '\n')
+    return entry
+
+
+_index_cache: Dict[str, tuple] = {}
+
+
+def load_capture_index(brand_dir: str) -> Dict[str, dict]:
+  """Return {markdown filename: index entry} for a brand (cached until the index file changes)"""
+  _, _, index_path = store_paths(brand_dir)
+  try:
+    st = os.stat(index_path)
+  except OSError:
+    return {}
+  cached = _index_cache.get(index_path)
+  if cached and cached[0] == (st.st_mtime_ns, st.st_size):
+    return cached[1]
+  entries: Dict[str, dict] = {}
+  with open(index_path, 'r', encoding='utf-8') as f:
+    for line in f:
+      try:
+        entry = json.loads(line)
+      except ValueError:
+        # Partial last line from an interrupted write
+        continue
+      entries[entry['file']] = entry
+  _index_cache[index_path] = ((st.st_mtime_ns, st.st_size), entries)
+  return entries
+
+
+def read_capture(brand_dir: str, fname: str) -> Optional[dict]:
+  """Inflate just one page's capture record from the stream (None if not stored)"""
+  entry = load_capture_index(brand_dir).get(fname)
+  if not entry:
+    return None
+  _, log_path, _ = store_paths(brand_dir)
+  try:
+    with open(log_path, 'rb') as log:
+      log.seek(entry['offset'])
+      member = log.read(entry['length'])
+    return json.loads(gzip.decompress(member))
+  except Exception:
+    return None
+
+
+def capture_url(brand_dir: str, fname: str) -> str:
+  """Page URL for a markdown file, from the capture index or a legacy .capture.json"""
+  entry = load_capture_index(brand_dir).get(fname)
+  if entry:
+    return entry.get('url', '') or ''
+  cap_path = os.path.join(brand_dir, os.path.splitext(fname)[0] + '.capture.json')
+  if os.path.exists(cap_path):
+    try:
+      with open(cap_path, 'r', encoding='utf-8') as f:
+        return json.load(f).get('url', '') or ''
+    except Exception:
+      return ''
+  return ''
+
+
+def compact_brand(brand_dir: str, *, force: bool = False) -> int:
+  """Rewrite a brand's capture stream with only the newest record of each page; returns bytes reclaimed.
+
+  Does nothing unless superseded records (and any torn tail from an
+  interrupted write) make up COMPACT_RATIO of the log, or force is set.
+  Members are copied as they are, without inflating them again.
+  """
+  _, log_path, index_path = store_paths(brand_dir)
+  try:
+    log_size = os.path.getsize(log_path)
+  except OSError:
+    return 0
+  entries = sorted(load_capture_index(brand_dir).values(), key=lambda e: e['offset'])
+  garbage = log_size - sum(e['length'] for e in entries)
+  if garbage <= 0 or (not force and garbage < COMPACT_RATIO * log_size):
+    return 0
+  log_tmp, index_tmp = f"{log_path}.tmp", f"{index_path}.tmp"
+  with open(log_path, 'rb') as src, open(log_tmp, 'wb') as log, open(index_tmp, 'w', encoding='utf-8') as idx:
+    for entry in entries:
+      src.seek(entry['offset'])
+      member = src.read(entry['length'])
+      entry = {**entry, 'offset': log.tell()}
+      log.write(member)
+      idx.write(json.dumps(entry) + '\n')
+  # Log first: until the index follows, readers of moved pages get None rather than a wrong record
+  os.replace(log_tmp, log_path)
+  os.replace(index_tmp, index_path)
+  return garbage
+
+
+def migrate_brand(brand_dir: str, *, delete: bool = False) -> int:
+  """Move every <page>.capture.json of a brand into its capture stream; returns pages migrated.
+
+  Pages already in the index are not appended again, so re-running is safe.
+  """
+  store = CaptureStore(brand_dir)
+  indexed = load_capture_index(brand_dir)
+  migrated = 0
+  for name in sorted(os.listdir(brand_dir)):
+    if not name.endswith('.capture.json'):
+      continue
+    cap_path = os.path.join(brand_dir, name)
+    fname = name[:-len('.capture.json')] + '.md'
+    if fname in indexed:
+      if delete:
+        os.remove(cap_path)
+      continue
+    try:
+      with open(cap_path, 'r', encoding='utf-8') as f:
+        capture = json.load(f)
+    except Exception as e:
+      print(f"  Skipping unreadable {name}: {e}")
+      continue
+    store.append(
+      fname,
+      json.dumps(capture, separators=(',', ':')),
+      url=capture.get('url', '') or '',
+      requests=len(capture.get('network_requests') or []),
+      console=len(capture.get('console_messages') or []),
+    )
+    migrated += 1
+    if delete:
+      os.remove(cap_path)
+  return migrated
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Manage compressed per-brand capture streams')
+  sub = parser.add_subparsers(dest='command', required=True)
+  mig = sub.add_parser('migrate', help='Convert existing .capture.json files into capture streams')
+  mig.add_argument('--brand', help='Single brand slug (default: all under output_markdown)')
+  mig.add_argument('--delete', action='store_true', help='Remove the .capture.json files once migrated')
+  comp = sub.add_parser('compact', help='Drop superseded records from capture streams')
+  comp.add_argument('--brand', help='Single brand slug (default: all under output_markdown)')
+  args = parser.parse_args()
+
+  base = os.path.join(ROOT, 'output_markdown')
+  if args.brand:
+    slugs = [args.brand]
+  else:
+    slugs = [d for d in os.listdir(base) if os.path.isdir(os.path.join(base, d)) and not d.startswith('_')]
+  for slug in slugs:
+    brand_dir = os.path.join(base, slug)
+    if args.command == 'compact':
+      reclaimed = compact_brand(brand_dir, force=True)
+      print(f"[{slug}] Compacted {os.path.join(STORE_DIR, LOG_NAME)}: {reclaimed:,} bytes reclaimed")
+      continue
+    count = migrate_brand(brand_dir, delete=args.delete)
+    print(f"[{slug}] Migrated {count} capture files -> {os.path.join(STORE_DIR, LOG_NAME)}")
+
+
+if __name__ == '__main__':
+  main()
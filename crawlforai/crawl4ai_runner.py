@@ -1,15 +1,28 @@
 import asyncio
 import argparse
 import os
-from urllib.parse import urljoin, urlparse
-from urllib.request import urlopen, Request
+from urllib.parse import urldefrag, urljoin, urlparse
 from xml.etree import ElementTree as ET
 import json
 import re
-import requests
-from urllib.parse import urljoin, urlparse
+import signal
+import time
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AsyncExitStack, asynccontextmanager
+from functools import partial
+from contextvars import ContextVar
+from datetime import datetime, timezone
 from pathlib import Path
 
+from blob_store import STORE_DIR as BLOB_STORE_DIR, BlobStore
+from capture_store import CaptureStore
+from url_canon import normalize_page_url, normalize_url, same_origin, url_origin
+from url_set import UrlMap, UrlSet
+from md_links import OTHER_LINK_EXTENSIONS, extract_asset_links, rewrite_links
+from viewer_app.search_index import update_search_index
+
 
 # Ensure UTF-8 console output on Windows to avoid 'charmap' Unicode errors
 import sys
@@ -31,360 +44,342 @@ def is_tracking_pixel(url):
   ]
   return any(domain in url for domain in tracking_domains)
 
-# Global cache to track downloaded assets by URL
-_asset_cache = {}
-_asset_stats = {
-  'downloaded': 0, 'cached': 0, 'skipped': 0,
-  'images': 0, 'pdfs': 0, 'txt_files': 0, 'other_files': 0
-}
+# Binary asset cache written with --compactCache (see url_set.UrlMap); preferred over the JSON one when present
+COMPACT_CACHE_NAME = '.asset_cache.bin'
 
-def clear_asset_cache():
-  """Clear the asset cache and reset stats (call at start of new crawl)"""
-  global _asset_cache, _asset_stats
-  _asset_cache.clear()
-  _asset_stats = {
-    'downloaded': 0, 'cached': 0, 'skipped': 0,
-    'images': 0, 'pdfs': 0, 'txt_files': 0, 'other_files': 0
-  }
-  print("Asset cache cleared")
+# Asset subdirectories under assets/ ('' = images in the main directory)
+ASSET_SUBDIRS = ['', 'pdf', 'txt', 'other']
 
-def cleanup_duplicate_assets(out_dir):
-  """Remove duplicate assets based on content hash (run after crawl)"""
-  import hashlib
-  from collections import defaultdict
+class AssetState:
+  """Asset cache, content-hash index, stats and journal of the brand being crawled"""
 
-  try:
-    assets_dir = Path(out_dir) / 'assets'
-    if not assets_dir.exists():
-      return
-
-    print("Scanning for duplicate assets...")
+  def __init__(self):
+    # Normalised asset URL -> relative path, persisted as .asset_cache.json
+    # (a UrlMap in .asset_cache.bin with --compactCache)
+    self.cache = {}
+    # Full content hash -> relative asset path, persisted as .asset_hashes.json
+    self.hashes = {}
+    self.stats = {
+      'downloaded': 0, 'cached': 0, 'skipped': 0,
+      'images': 0, 'pdfs': 0, 'txt_files': 0, 'other_files': 0
+    }
+    # Progress journal of the brand being crawled (see CrawlJournal)
+    self.journal = None
+    # Cross-brand BlobStore when --sharedAssets is on
+    self.blobs = None
 
-    # Track files by content hash
-    content_hashes = defaultdict(list)
+# Each brand crawl runs in its own asyncio context, so brands crawled
+# concurrently in one event loop never share asset state
+_asset_state: ContextVar[AssetState] = ContextVar('asset_state', default=AssetState())
 
-    # Scan all asset directories
-    for root_dir in [assets_dir, assets_dir / 'pdf', assets_dir / 'txt']:
-      if not root_dir.exists():
-        continue
+def _assets() -> AssetState:
+  return _asset_state.get()
 
-      for file_path in root_dir.iterdir():
-        if file_path.is_file():
-          try:
-            with open(file_path, 'rb') as f:
-              content = f.read()
-            content_hash = hashlib.md5(content).hexdigest()
-            content_hashes[content_hash].append(file_path)
-          except Exception:
-            continue
-
-    # Remove duplicates (keep the first one, remove others)
-    removed_count = 0
-    for content_hash, file_list in content_hashes.items():
-      if len(file_list) > 1:
-        # Keep the first file, remove the rest
-        for duplicate_file in file_list[1:]:
-          try:
-            duplicate_file.unlink()
-            removed_count += 1
-            print(f"Removed duplicate: {duplicate_file.name}")
-          except Exception as e:
-            print(f"Failed to remove {duplicate_file.name}: {e}")
-
-    if removed_count > 0:
-      print(f"Cleanup complete: Removed {removed_count} duplicate assets")
-    else:
-      print("No duplicate assets found")
+def clear_asset_cache():
+  """Clear the asset cache and reset stats (call at start of new crawl)"""
+  _asset_state.set(AssetState())
+  print("Asset cache cleared")
 
-  except Exception as e:
-    print(f"Error during asset cleanup: {e}")
+def remember_asset(normalized_url, relative_path):
+  """Map a normalised asset URL to its local path and journal it for --resume"""
+  state = _assets()
+  state.cache[normalized_url] = relative_path
+  if state.journal is not None:
+    state.journal.asset(normalized_url, relative_path)
 
 def get_asset_stats():
   """Get current asset download statistics"""
-  return _asset_stats.copy()
+  return _assets().stats.copy()
 
 def save_asset_cache(out_dir):
   """Save asset cache to disk for persistence"""
   try:
+    if isinstance(_assets().cache, UrlMap):
+      _assets().cache.save(os.path.join(out_dir, COMPACT_CACHE_NAME))
+      print(f"Asset cache saved ({len(_assets().cache)} entries, compact)")
+      return
     cache_file = os.path.join(out_dir, '.asset_cache.json')
-    with open(cache_file, 'w') as f:
-      json.dump(_asset_cache, f, indent=2)
-    print(f"Asset cache saved ({len(_asset_cache)} entries)")
+    with open(cache_file + '.tmp', 'w') as f:
+      json.dump(_assets().cache, f, indent=2)
+    os.replace(cache_file + '.tmp', cache_file)
+    print(f"Asset cache saved ({len(_assets().cache)} entries)")
   except Exception as e:
     print(f"Failed to save asset cache: {e}")
 
-def load_asset_cache(out_dir):
-  """Load asset cache from disk"""
+def load_asset_cache(out_dir, compact: bool = False):
+  """Load asset cache from disk (with compact, as a UrlMap, converting an existing JSON cache once)"""
   try:
     cache_file = os.path.join(out_dir, '.asset_cache.json')
-    if os.path.exists(cache_file):
+    compact_file = os.path.join(out_dir, COMPACT_CACHE_NAME)
+    if compact and os.path.exists(compact_file):
+      _assets().cache = UrlMap.load(compact_file, bloom=True)
+      print(f"Asset cache loaded ({len(_assets().cache)} entries, compact)")
+    elif compact:
+      items = {}
+      if os.path.exists(cache_file):
+        with open(cache_file, 'r') as f:
+          items = json.load(f)
+      _assets().cache = UrlMap(items, bloom=True)
+      print(f"Asset cache converted to {COMPACT_CACHE_NAME} ({len(items)} entries)")
+    elif os.path.exists(cache_file):
       with open(cache_file, 'r') as f:
-        global _asset_cache
-        _asset_cache = json.load(f)
-      print(f"Asset cache loaded ({len(_asset_cache)} entries)")
+        _assets().cache = json.load(f)
+      print(f"Asset cache loaded ({len(_assets().cache)} entries)")
     else:
       print("No existing asset cache found")
   except Exception as e:
     print(f"Failed to load asset cache: {e}")
-    _asset_cache.clear()
-
-def find_existing_file_by_content_hash(assets_dir, content_hash, is_pdf, is_text, is_other=False):
-  """Find existing file with same content hash to avoid content duplicates"""
-  import hashlib
+    _assets().cache = UrlMap(bloom=True) if compact else {}
 
-  try:
-    # Determine which directories to search
-    search_dirs = [assets_dir]  # Always search main assets dir
-
-    if is_pdf:
-      pdf_dir = assets_dir / 'pdf'
-      if pdf_dir.exists():
-        search_dirs.append(pdf_dir)
-    elif is_text:
-      txt_dir = assets_dir / 'txt'
-      if txt_dir.exists():
-        search_dirs.append(txt_dir)
-    elif is_other:
-      other_dir = assets_dir / 'other'
-      if other_dir.exists():
-        search_dirs.append(other_dir)
-
-    # Search all relevant directories
-    for search_dir in search_dirs:
-      if not search_dir.exists():
-        continue
+def asset_file_path(assets_dir, relative_path):
+  """Resolve a './assets/...' path recorded in the caches to a file under assets_dir"""
+  return Path(assets_dir).parent / relative_path
 
-      for existing_file in search_dir.iterdir():
-        if existing_file.is_file():
-          try:
-            # Calculate hash of existing file
-            with open(existing_file, 'rb') as f:
-              existing_content = f.read()
-            existing_hash = hashlib.md5(existing_content).hexdigest()[:8]
-
-            # If hashes match, we found a duplicate
-            if existing_hash == content_hash:
-              # Return relative path based on file location
-              if existing_file.parent.name == 'pdf':
-                return f"./assets/pdf/{existing_file.name}"
-              elif existing_file.parent.name == 'txt':
-                return f"./assets/txt/{existing_file.name}"
-              elif existing_file.parent.name == 'other':
-                return f"./assets/other/{existing_file.name}"
-              else:
-                return f"./assets/{existing_file.name}"
-
-          except Exception:
-            # Skip files we can't read
-            continue
+def hash_file(path):
+  """Full-length SHA-256 of a file, read in chunks"""
+  import hashlib
 
-    return None
+  h = hashlib.sha256()
+  with open(path, 'rb') as f:
+    for chunk in iter(lambda: f.read(1024 * 1024), b''):
+      h.update(chunk)
+  return h.hexdigest()
 
+def save_asset_hash_index(out_dir):
+  """Save the content-hash -> path index next to the asset cache, dropping entries for deleted files"""
+  try:
+    hashes = _assets().hashes
+    assets_dir = Path(out_dir) / 'assets'
+    for content_hash, rel in list(hashes.items()):
+      if not asset_file_path(assets_dir, rel).exists():
+        del hashes[content_hash]
+    index_file = os.path.join(out_dir, '.asset_hashes.json')
+    with open(index_file + '.tmp', 'w') as f:
+      json.dump(hashes, f, indent=2)
+    os.replace(index_file + '.tmp', index_file)
+    print(f"Asset hash index saved ({len(hashes)} entries)")
   except Exception as e:
-    print(f"Error checking for content duplicates: {e}")
-    return None
-
-def normalize_url(url):
-  """Normalize URL by removing dynamic parameters that cause duplicates"""
-  from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
+    print(f"Failed to save asset hash index: {e}")
 
+def load_asset_hash_index(out_dir):
+  """Load the content-hash index and hash only asset files it does not know about yet"""
+  hashes = {}
+  index_file = os.path.join(out_dir, '.asset_hashes.json')
   try:
-    parsed = urlparse(url)
-
-    # Remove common dynamic parameters that cause duplicates
-    dynamic_params = {
-      'v', 'version', 'timestamp', 'ts', 't', 'cache', 'cb', 'cachebuster',
-      '_', 'rand', 'random', 'time', 'nocache', 'bust', 'rev', 'r'
-    }
-
-    # Parse query parameters
-    query_params = parse_qs(parsed.query, keep_blank_values=True)
-
-    # Remove dynamic parameters
-    filtered_params = {
-      key: value for key, value in query_params.items()
-      if key.lower() not in dynamic_params
-    }
-
-    # Rebuild query string
-    new_query = urlencode(filtered_params, doseq=True)
-
-    # Rebuild URL
-    normalized = urlunparse((
-      parsed.scheme, parsed.netloc, parsed.path,
-      parsed.params, new_query, parsed.fragment
-    ))
+    if os.path.exists(index_file):
+      with open(index_file, 'r') as f:
+        hashes = json.load(f)
+  except Exception as e:
+    print(f"Failed to load asset hash index: {e}")
+    hashes = {}
+  _assets().hashes = hashes
+
+  # Reconcile with what is on disk (first run, files removed or added by cleanup scripts)
+  assets_dir = Path(out_dir) / 'assets'
+  known = set()
+  for content_hash, rel in list(hashes.items()):
+    if asset_file_path(assets_dir, rel).exists():
+      known.add(rel)
+    else:
+      del hashes[content_hash]
+  added = 0
+  for sub in ASSET_SUBDIRS:
+    root_dir = assets_dir / sub if sub else assets_dir
+    if not root_dir.exists():
+      continue
+    prefix = f"./assets/{sub}/" if sub else "./assets/"
+    for file_path in root_dir.iterdir():
+      if file_path.name.endswith('.part'):
+        # Leftover partial download from an interrupted run
+        file_path.unlink(missing_ok=True)
+        continue
+      rel = prefix + file_path.name
+      if rel in known or not file_path.is_file():
+        continue
+      try:
+        hashes.setdefault(hash_file(file_path), rel)
+        added += 1
+      except Exception:
+        continue
+  print(f"Asset hash index loaded ({len(hashes)} entries, {added} newly hashed)")
+
+def find_existing_file_by_content_hash(assets_dir, content_hash):
+  """Return the relative path of an existing asset with this content hash (O(1) index lookup)"""
+  hashes = _assets().hashes
+  rel = hashes.get(content_hash)
+  if rel and asset_file_path(assets_dir, rel).exists():
+    return rel
+  if rel:
+    # File was removed since it was indexed
+    hashes.pop(content_hash, None)
+  return None
+
+# kind -> (stats key, label, assets subdirectory)
+ASSET_KINDS = {
+  'pdf': ('pdfs', 'PDF', 'pdf'),
+  'txt': ('txt_files', 'TXT', 'txt'),
+  'other': ('other_files', 'other', 'other'),
+  'image': ('images', 'image', None),
+}
 
-    return normalized
+def resolve_asset_url(url, base_url):
+  """Make protocol-relative and root-relative asset URLs absolute"""
+  if url.startswith('//'):
+    return 'https:' + url
+  if url.startswith('/'):
+    return urljoin(base_url, url)
+  return url
 
-  except Exception:
-    # If normalization fails, return original URL
-    return url
+def asset_filename(url, normalized_url):
+  """Build the on-disk filename for an asset: <clean name>_<normalized url hash>.<ext>"""
+  import hashlib
 
-def download_asset(url, assets_dir, base_url):
+  parsed = urlparse(url)
+  path_parts = parsed.path.split('/')
+  filename = path_parts[-1] if path_parts[-1] else 'image'
+
+  # Clean filename and add extension if missing
+  filename = re.sub(r'[^\w\-_\.]', '_', filename)
+  if '.' not in filename:
+    filename += '.jpg'  # Default extension
+
+  # Hash the normalized URL to ensure uniqueness while avoiding duplicates
+  url_hash = hashlib.md5(normalized_url.encode()).hexdigest()[:8]
+  name, ext = filename.rsplit('.', 1)
+  return f"{name}_{url_hash}.{ext}"
+
+def classify_asset(url, content_type):
+  """Return the asset kind ('pdf', 'txt', 'other', 'image') or None if unsupported"""
+  lower = url.lower()
+  if 'application/pdf' in content_type:
+    return 'pdf'
+  if 'image/' in content_type:
+    return 'image'
+  if any(t in content_type for t in ['text/plain', 'application/octet-stream']) and lower.endswith('.txt'):
+    return 'txt'
+  if lower.endswith(OTHER_LINK_EXTENSIONS):
+    return 'other'
+  return None
+
+def asset_destination(assets_dir, unique_filename, kind):
+  """Return (final_path, relative_path) for an asset, creating its subdirectory"""
+  subdir = ASSET_KINDS[kind][2]
+  if subdir:
+    target_dir = assets_dir / subdir
+    target_dir.mkdir(exist_ok=True)
+    return target_dir / unique_filename, f"./assets/{subdir}/{unique_filename}"
+  # Images go in main assets directory
+  return assets_dir / unique_filename, f"./assets/{unique_filename}"
+
+def record_asset(kind, *, downloaded):
+  """Update download stats for an asset and return its display label"""
+  stats_key, label, _ = ASSET_KINDS[kind]
+  stats = _assets().stats
+  stats['downloaded' if downloaded else 'cached'] += 1
+  stats[stats_key] += 1
+  return label
+
+async def download_asset(session, url, assets_dir, base_url):
   """Download an image or PDF and return local path (with advanced deduplication)"""
+  import hashlib
+
   try:
     if is_tracking_pixel(url):
       return None
 
-    # Make URL absolute
-    if url.startswith('//'):
-      url = 'https:' + url
-    elif url.startswith('/'):
-      url = urljoin(base_url, url)
+    url = resolve_asset_url(url, base_url)
 
     # Normalize URL to remove dynamic parameters
     normalized_url = normalize_url(url)
 
     # Check if we've already downloaded this normalized URL
-    if normalized_url in _asset_cache:
-      cached_path = _asset_cache[normalized_url]
+    state = _assets()
+    if normalized_url in state.cache:
+      cached_path = state.cache[normalized_url]
       # Verify the file still exists
-      if cached_path and (assets_dir / Path(cached_path).name).exists():
-        _asset_stats['cached'] += 1
+      if cached_path and asset_file_path(assets_dir, cached_path).exists():
+        state.stats['cached'] += 1
         print(f"Using cached asset (normalized): {url} -> {cached_path}")
         return cached_path
       else:
         # Remove from cache if file doesn't exist
-        del _asset_cache[normalized_url]
-
-    # Get file extension
-    parsed = urlparse(url)
-    path_parts = parsed.path.split('/')
-    filename = path_parts[-1] if path_parts[-1] else 'image'
-
-    # Clean filename and add extension if missing
-    filename = re.sub(r'[^\w\-_\.]', '_', filename)
-    if '.' not in filename:
-      filename += '.jpg'  # Default extension
-
-    # Create a hash-based filename using normalized URL to ensure uniqueness while avoiding duplicates
-    import hashlib
-    url_hash = hashlib.md5(normalized_url.encode()).hexdigest()[:8]
-    name, ext = (filename.rsplit('.', 1) if '.' in filename else (filename, 'jpg'))
-    unique_filename = f"{name}_{url_hash}.{ext}"
+        state.cache.pop(normalized_url, None)
+
+    unique_filename = asset_filename(url, normalized_url)
+
+    # Another brand may already hold these bytes: link them instead of downloading
+    shared = state.blobs.lookup_url(normalized_url) if state.blobs is not None else None
+    if shared:
+      content_hash, kind = shared
+      existing_file = find_existing_file_by_content_hash(assets_dir, content_hash)
+      if existing_file:
+        remember_asset(normalized_url, existing_file)
+        asset_type = record_asset(kind, downloaded=False)
+        print(f"Content duplicate found for {asset_type}: {url} -> {existing_file}")
+        return existing_file
+      final_path, relative_path = asset_destination(assets_dir, unique_filename, kind)
+      if not final_path.exists() and state.blobs.link_into(content_hash, final_path):
+        remember_asset(normalized_url, relative_path)
+        state.hashes[content_hash] = relative_path
+        asset_type = record_asset(kind, downloaded=False)
+        print(f"Linked shared {asset_type}: {url} -> {relative_path}")
+        return relative_path
 
-    # We'll determine the final path after checking content type
-    local_path = assets_dir / unique_filename
-
-    # Download file
     print(f"Downloading asset: {url}")
-    response = requests.get(url, timeout=10, stream=True)
-    response.raise_for_status()
-
-    # Check if it's actually an image/PDF/text file or other downloadable file
-    content_type = response.headers.get('content-type', '').lower()
-    is_pdf = 'application/pdf' in content_type
-    is_image = any(t in content_type for t in ['image/'])
-    is_text = any(t in content_type for t in ['text/plain', 'application/octet-stream']) and url.lower().endswith('.txt')
-
-    # Check for other common file types we want to download
-    other_extensions = ['.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.zip', '.rar', '.csv', '.xml', '.json']
-    is_other = any(url.lower().endswith(ext) for ext in other_extensions)
-
-    if not (is_pdf or is_image or is_text or is_other):
-      _asset_stats['skipped'] += 1
-      print(f"Skipping non-supported asset: {url} (content-type: {content_type})")
-      return None
-
-    # Determine the correct subdirectory based on content type
-    if is_pdf:
-      # Create PDF subdirectory
-      pdf_dir = assets_dir / 'pdf'
-      pdf_dir.mkdir(exist_ok=True)
-      final_path = pdf_dir / unique_filename
-      relative_path = f"./assets/pdf/{unique_filename}"
-    elif is_text:
-      # Create TXT subdirectory
-      txt_dir = assets_dir / 'txt'
-      txt_dir.mkdir(exist_ok=True)
-      final_path = txt_dir / unique_filename
-      relative_path = f"./assets/txt/{unique_filename}"
-    elif is_other:
-      # Create OTHER subdirectory for other file types
-      other_dir = assets_dir / 'other'
-      other_dir.mkdir(exist_ok=True)
-      final_path = other_dir / unique_filename
-      relative_path = f"./assets/other/{unique_filename}"
-    else:
-      # Images go in main assets directory
-      final_path = local_path
-      relative_path = f"./assets/{unique_filename}"
-
-    # Update cache and check if file already exists in correct location
-    if final_path.exists():
-      _asset_cache[normalized_url] = relative_path
-      _asset_stats['cached'] += 1
-
-      # Track by file type for cached assets too
-      if is_pdf:
-        _asset_stats['pdfs'] += 1
-        asset_type = "PDF"
-      elif is_text:
-        _asset_stats['txt_files'] += 1
-        asset_type = "TXT"
-      elif is_other:
-        _asset_stats['other_files'] += 1
-        asset_type = "other"
-      else:
-        _asset_stats['images'] += 1
-        asset_type = "image"
-
-      print(f"Cached {asset_type} already exists: {url} -> {relative_path}")
-      return relative_path
-
-    # Download content to memory first for content-based deduplication
-    content = b''
-    for chunk in response.iter_content(chunk_size=8192):
-      content += chunk
-
-    # Create content hash for duplicate detection
-    content_hash = hashlib.md5(content).hexdigest()[:8]
+    async with session.get(url) as response:
+      response.raise_for_status()
+
+      # Check if it's actually an image/PDF/text file or other downloadable file
+      content_type = response.headers.get('content-type', '').lower()
+      kind = classify_asset(url, content_type)
+      if kind is None:
+        state.stats['skipped'] += 1
+        print(f"Skipping non-supported asset: {url} (content-type: {content_type})")
+        return None
+
+      final_path, relative_path = asset_destination(assets_dir, unique_filename, kind)
+
+      # Update cache and check if file already exists in correct location
+      if final_path.exists():
+        remember_asset(normalized_url, relative_path)
+        asset_type = record_asset(kind, downloaded=False)
+        print(f"Cached {asset_type} already exists: {url} -> {relative_path}")
+        return relative_path
+
+      # Stream to a temp file next to the target, hashing as we go (constant memory per download)
+      tmp_path = final_path.with_name(f".{final_path.name}.{uuid.uuid4().hex[:8]}.part")
+      digest = hashlib.sha256()
+      try:
+        with open(tmp_path, 'wb') as f:
+          async for chunk in response.content.iter_chunked(64 * 1024):
+            digest.update(chunk)
+            f.write(chunk)
+      except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    content_hash = digest.hexdigest()
+    if state.blobs is not None:
+      state.blobs.remember_url(normalized_url, content_hash, kind)
 
     # Check if we already have a file with this exact content
-    existing_file = find_existing_file_by_content_hash(assets_dir, content_hash, is_pdf, is_text, is_other)
+    existing_file = find_existing_file_by_content_hash(assets_dir, content_hash)
     if existing_file:
-      _asset_cache[normalized_url] = existing_file
-      _asset_stats['cached'] += 1
-
-      # Track by file type for cached content duplicates
-      if is_pdf:
-        _asset_stats['pdfs'] += 1
-        asset_type = "PDF"
-      elif is_text:
-        _asset_stats['txt_files'] += 1
-        asset_type = "TXT"
-      elif is_other:
-        _asset_stats['other_files'] += 1
-        asset_type = "other"
-      else:
-        _asset_stats['images'] += 1
-        asset_type = "image"
-
+      tmp_path.unlink(missing_ok=True)
+      remember_asset(normalized_url, existing_file)
+      asset_type = record_asset(kind, downloaded=False)
       print(f"Content duplicate found for {asset_type}: {url} -> {existing_file}")
       return existing_file
 
-    # Save file to the correct location
-    with open(final_path, 'wb') as f:
-      f.write(content)
-
-    _asset_cache[normalized_url] = relative_path
-    _asset_stats['downloaded'] += 1
-
-    # Track by file type
-    if is_pdf:
-      _asset_stats['pdfs'] += 1
-      asset_type = "PDF"
-    elif is_text:
-      _asset_stats['txt_files'] += 1
-      asset_type = "TXT"
-    elif is_other:
-      _asset_stats['other_files'] += 1
-      asset_type = "other"
-    else:
-      _asset_stats['images'] += 1
-      asset_type = "image"
+    # Atomically move the completed download into place
+    os.replace(tmp_path, final_path)
+    if state.blobs is not None:
+      # Share the bytes with other brands (or link to a copy one of them already has)
+      state.blobs.adopt(final_path, content_hash)
 
+    remember_asset(normalized_url, relative_path)
+    state.hashes[content_hash] = relative_path
+    asset_type = record_asset(kind, downloaded=True)
     print(f"Downloaded {asset_type}: {url} -> {relative_path}")
     return relative_path
 
@@ -392,6 +387,62 @@ def download_asset(url, assets_dir, base_url):
     print(f"Failed to download {url}: {e}")
     return None
 
+class AssetDownloader:
+  """Async asset downloads sharing one HTTP connection pool across a brand's pages.
+
+  `limit_per_host` caps open connections per host, `max_concurrent` caps
+  downloads in flight overall, and a normalised URL referenced by several
+  pages at once is only fetched a single time.
+  """
+
+  def __init__(self, *, max_concurrent: int = 8, limit_per_host: int = 4, timeout: float = 10.0):
+    self.max_concurrent = max(1, max_concurrent)
+    self.limit_per_host = max(1, limit_per_host)
+    self.timeout = timeout
+    self._session = None
+    self._sem = asyncio.Semaphore(self.max_concurrent)
+    self._inflight: dict[str, asyncio.Task] = {}
+
+  async def __aenter__(self):
+    connector = aiohttp.TCPConnector(limit=self.max_concurrent, limit_per_host=self.limit_per_host)
+    self._session = aiohttp.ClientSession(
+      connector=connector,
+      # Connect/read timeouts only: a large PDF may take longer than `timeout` in total while still streaming
+      timeout=aiohttp.ClientTimeout(total=None, sock_connect=self.timeout, sock_read=self.timeout),
+      headers={'User-Agent': USER_AGENT},
+    )
+    return self
+
+  async def __aexit__(self, *exc):
+    if self._inflight:
+      await asyncio.gather(*self._inflight.values(), return_exceptions=True)
+    await self._session.close()
+
+  async def _download(self, url, assets_dir, base_url):
+    async with self._sem:
+      return await download_asset(self._session, url, assets_dir, base_url)
+
+  async def fetch(self, url, assets_dir, base_url):
+    """Download one asset (or join an in-flight download of the same URL)"""
+    key = normalize_url(resolve_asset_url(url, base_url))
+    task = self._inflight.get(key)
+    if task is None:
+      task = asyncio.ensure_future(self._download(url, assets_dir, base_url))
+      self._inflight[key] = task
+      task.add_done_callback(lambda _t, k=key: self._inflight.pop(k, None))
+    return await task
+
+async def localize_page_assets(downloader, md_path, md, asset_urls, assets_dir, base_url):
+  """Download a page's assets concurrently, then rewrite its markdown once with local paths"""
+  unique_urls = list(dict.fromkeys(asset_urls))
+  local_paths = await asyncio.gather(*(downloader.fetch(u, assets_dir, base_url) for u in unique_urls))
+  rewritten = rewrite_links(md, {u: p for u, p in zip(unique_urls, local_paths) if p})
+  if rewritten != md:
+    with open(md_path, 'w', encoding='utf-8') as f:
+      f.write(rewritten)
+    return rewritten
+  return None
+
 # Optional: if crawl4ai is not installed, the user must run
 #   pip install -r requirements.txt
 try:
@@ -405,6 +456,7 @@ try:
     CrawlerMonitor,
     DisplayMode,
   )
+  import aiohttp  # installed alongside crawl4ai
   from crawl4ai.async_crawler_strategy import AsyncPlaywrightCrawlerStrategy  # type: ignore
   from crawl4ai.async_dispatcher import MemoryAdaptiveDispatcher, SemaphoreDispatcher  # type: ignore
   from crawl4ai.processors.pdf import PDFContentScrapingStrategy, PDFCrawlerStrategy  # type: ignore
@@ -419,63 +471,656 @@ def read_brands():
     return json.load(f)
 
 
-def same_origin(u: str, origin: str) -> bool:
-  try:
-    return urlparse(u).netloc == urlparse(origin).netloc and urlparse(u).scheme in ("http", "https")
-  except Exception:
-    return False
+SITEMAP_CACHE = '.sitemap_cache.json'
+USER_AGENT = 'Crawl4AI-Runner/1.0'
 
 
-def fetch_text(url: str, timeout: int = 10) -> str:
-  req = Request(url, headers={'User-Agent': 'Crawl4AI-Runner/1.0'})
-  with urlopen(req, timeout=timeout) as r:  # nosec - user controlled domains are partners
-    return r.read().decode('utf-8', errors='ignore')
+def load_sitemap_cache(out_dir: str | None) -> dict:
+  """Load cached sitemap contents: sitemap URL -> {etag, last_modified, urls, sitemaps}"""
+  if not out_dir:
+    return {}
+  path = os.path.join(out_dir, SITEMAP_CACHE)
+  if not os.path.exists(path):
+    return {}
+  try:
+    with open(path, 'r', encoding='utf-8') as f:
+      return json.load(f)
+  except Exception as e:
+    print(f"Failed to load sitemap cache: {e}")
+    return {}
 
 
-def discover_sitemap_urls(origin: str, timeout: int = 10) -> list[str]:
-  seeds: set[str] = set()
-  # robots.txt discovery
+def save_sitemap_cache(out_dir: str | None, cache: dict):
+  if not out_dir:
+    return
+  os.makedirs(out_dir, exist_ok=True)
+  path = os.path.join(out_dir, SITEMAP_CACHE)
   try:
-    robots = urljoin(origin, '/robots.txt')
-    text = fetch_text(robots, timeout)
-    for line in text.splitlines():
-      if line.lower().startswith('sitemap:'):
-        sm = line.split(':', 1)[1].strip()
-        if sm:
-          seeds.update(fetch_sitemap(sm, timeout))
-  except Exception:
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+      json.dump(cache, f)
+    os.replace(path + '.tmp', path)
+  except Exception as e:
+    print(f"Failed to save sitemap cache: {e}")
+
+
+# Sitemap protocol namespace; sitemaps that omit xmlns use the bare names
+SITEMAP_NS = '{http://www.sitemaps.org/schemas/sitemap/0.9}'
+
+
+def _sitemap_tag(tag: str) -> str | None:
+  """Local name of a sitemap-protocol element, None for extensions such as <image:loc>"""
+  if tag.startswith(SITEMAP_NS):
+    return tag[len(SITEMAP_NS):]
+  return None if tag.startswith('{') else tag
+
+
+class SitemapParser:
+  """Incremental sitemap parser fed raw chunks as they arrive.
+
+  Collects (loc, lastmod) pairs from <url> entries and child sitemap URLs from
+  <sitemap> entries, clearing each element once read so memory stays flat on
+  very large sitemaps. Gzipped sitemaps (*.xml.gz) are inflated on the fly.
+  Only <loc>/<lastmod> directly under an entry count, so extension elements
+  (image, video and news sitemaps) never replace the page URL.
+  """
+
+  def __init__(self, gzipped: bool = False):
+    self.urls: list[tuple[str, str | None]] = []
+    self.sitemaps: list[str] = []
+    self._parser = ET.XMLPullParser(events=('start', 'end'))
+    # Sitemap-protocol local names of the open elements (None for extensions)
+    self._open: list[str | None] = []
+    self._inflate = zlib.decompressobj(16 + zlib.MAX_WBITS) if gzipped else None
+    self._loc = None
+    self._lastmod = None
+
+  def feed(self, chunk: bytes):
+    if self._inflate is not None:
+      chunk = self._inflate.decompress(chunk)
+    self._parser.feed(chunk)
+    self._drain()
+
+  def close(self):
+    if self._inflate is not None:
+      self._parser.feed(self._inflate.flush())
+    self._parser.close()
+    self._drain()
+
+  def _drain(self):
+    for event, elem in self._parser.read_events():
+      if event == 'start':
+        self._open.append(_sitemap_tag(elem.tag))
+        continue
+      tag = self._open.pop()
+      parent = self._open[-1] if self._open else None
+      if tag in ('loc', 'lastmod') and parent in ('url', 'sitemap') and len(self._open) == 2:
+        value = (elem.text or '').strip() or None
+        if tag == 'loc':
+          self._loc = value
+        else:
+          self._lastmod = value
+      elif tag in ('url', 'sitemap') and len(self._open) == 1:
+        if self._loc:
+          if tag == 'url':
+            self.urls.append((self._loc, self._lastmod))
+          else:
+            self.sitemaps.append(self._loc)
+        self._loc = self._lastmod = None
+        elem.clear()
+
+
+async def fetch_sitemap(session, sitemap_url: str, cache: dict) -> tuple[list[tuple[str, str | None]], list[str]]:
+  """Return ((loc, lastmod) pairs, child sitemap URLs) for one sitemap.
+
+  Uses a conditional GET against the cached validators and serves the cached
+  entries on 304, or when the server cannot be reached (network error,
+  timeout, 5xx). A 4xx means the sitemap is gone, so its cache entry is
+  dropped and nothing is returned.
+  """
+  cached = cache.get(sitemap_url)
+  headers = {}
+  if cached:
+    if cached.get('etag'):
+      headers['If-None-Match'] = cached['etag']
+    if cached.get('last_modified'):
+      headers['If-Modified-Since'] = cached['last_modified']
+  try:
+    async with session.get(sitemap_url, headers=headers) as resp:
+      if resp.status == 304 and cached:
+        return [tuple(u) for u in cached.get('urls', [])], cached.get('sitemaps', [])
+      resp.raise_for_status()
+      parser = SitemapParser(gzipped=urlparse(sitemap_url).path.endswith('.gz'))
+      async for chunk in resp.content.iter_chunked(64 * 1024):
+        parser.feed(chunk)
+      parser.close()
+      cache[sitemap_url] = {
+        'etag': resp.headers.get('etag'),
+        'last_modified': resp.headers.get('last-modified'),
+        'urls': parser.urls,
+        'sitemaps': parser.sitemaps,
+      }
+      return parser.urls, parser.sitemaps
+  except aiohttp.ClientResponseError as e:
+    if e.status < 500:
+      cache.pop(sitemap_url, None)
+      return [], []
+  except (aiohttp.ClientError, asyncio.TimeoutError):
     pass
-  # common fallbacks
-  for p in ['/sitemap.xml', '/sitemap_index.xml']:
+  except Exception:
+    # Unparseable sitemap: the cached copy is no better evidence of what it lists
+    return [], []
+  if cached:
+    return [tuple(u) for u in cached.get('urls', [])], cached.get('sitemaps', [])
+  return [], []
+
+
+async def discover_sitemap_entries(origin: str, timeout: int = 10, *, cache_dir: str | None = None, concurrency: int = 8, max_depth: int = 3) -> dict[str, str | None]:
+  """Return same-origin sitemap URLs mapped to their <lastmod> (None when absent).
+
+  Sitemaps listed in robots.txt plus the common fallbacks are fetched
+  concurrently, then each level of sitemap-index children likewise. When
+  cache_dir is given, parsed contents and validators persist in
+  .sitemap_cache.json there so unchanged sitemaps cost one 304 on later runs.
+  """
+  cache = load_sitemap_cache(cache_dir)
+  entries: dict[str, str | None] = {}
+  sem = asyncio.Semaphore(concurrency)
+
+  async with aiohttp.ClientSession(
+    # Per-socket limits, so a large (but streaming) sitemap is not cut off
+    timeout=aiohttp.ClientTimeout(total=None, sock_connect=timeout, sock_read=timeout),
+    headers={'User-Agent': USER_AGENT},
+  ) as session:
+    # robots.txt discovery
+    seeds: list[str] = []
     try:
-      seeds.update(fetch_sitemap(urljoin(origin, p), timeout))
+      async with session.get(urljoin(origin, '/robots.txt')) as resp:  # nosec - user controlled domains are partners
+        if resp.status == 200:
+          text = await resp.text(errors='ignore')
+          for line in text.splitlines():
+            if line.lower().startswith('sitemap:'):
+              sm = line.split(':', 1)[1].strip()
+              if sm:
+                seeds.append(sm)
     except Exception:
       pass
+    # common fallbacks
+    seeds.extend(urljoin(origin, p) for p in ['/sitemap.xml', '/sitemap_index.xml'])
+
+    async def fetch(u):
+      async with sem:
+        return await fetch_sitemap(session, u, cache)
+
+    visited: set[str] = set()
+    level = list(dict.fromkeys(seeds))
+    for _ in range(max_depth + 1):
+      level = [u for u in level if u not in visited]
+      if not level:
+        break
+      visited.update(level)
+      children: list[str] = []
+      for urls, sitemaps in await asyncio.gather(*(fetch(u) for u in level)):
+        for loc, lastmod in urls:
+          if lastmod or loc not in entries:
+            entries[loc] = lastmod
+        children.extend(sitemaps)
+      level = list(dict.fromkeys(children))
+
+  # Forget sitemaps that were not reachable from this run's seeds
+  save_sitemap_cache(cache_dir, {u: v for u, v in cache.items() if u in visited})
   # only same-origin
-  return [u for u in seeds if same_origin(u, origin)]
+  return {u: lm for u, lm in entries.items() if same_origin(u, origin)}
+
 
+CRAWL_MANIFEST = '.crawl_manifest.json'
 
-def fetch_sitemap(sitemap_url: str, timeout: int = 10) -> list[str]:
+
+def load_crawl_manifest(out_dir: str) -> dict:
+  """Load the per-brand crawl manifest.
+
+  page URL -> {file, url, size, sha256, assets, lastmod, etag, last_modified, fetched_at}
+  where `url` is the final (post-redirect) URL and `assets` counts the page's
+  image/pdf/txt/other links. Records from older runs may lack the content fields.
+  """
+  path = os.path.join(out_dir, CRAWL_MANIFEST)
+  if not os.path.exists(path):
+    return {}
+  try:
+    with open(path, 'r', encoding='utf-8') as f:
+      return json.load(f).get('pages', {})
+  except Exception as e:
+    print(f"Failed to load crawl manifest: {e}")
+    return {}
+
+
+def save_crawl_manifest(out_dir: str, pages: dict):
+  """Atomically write the per-brand crawl manifest"""
+  path = os.path.join(out_dir, CRAWL_MANIFEST)
+  tmp = path + '.tmp'
   try:
-    xml = fetch_text(sitemap_url, timeout)
-    tree = ET.fromstring(xml)
+    with open(tmp, 'w', encoding='utf-8') as f:
+      json.dump({'version': 1, 'pages': pages}, f)
+    os.replace(tmp, path)
+  except Exception as e:
+    print(f"Failed to save crawl manifest: {e}")
+
+
+def header_value(headers, name: str):
+  """Case-insensitive header lookup"""
+  for k, v in (headers or {}).items():
+    if k.lower() == name:
+      return v
+  return None
+
+
+def page_content_fields(md_path: str, md: str) -> dict:
+  """Size on disk and SHA-256 of a page's markdown, for its manifest record"""
+  import hashlib
+
+  return {
+    'size': os.path.getsize(md_path),
+    'sha256': hashlib.sha256(md.encode('utf-8')).hexdigest(),
+  }
+
+
+def record_page(pages: dict, url: str, fname: str, result, lastmod: str | None, depth: int = 0):
+  """Record a freshly rendered page (validators, content hash, asset counts) in the crawl manifest.
+
+  depth is the link depth the frontier reached the page at (0 for sitemap URLs).
+  """
+  if not getattr(result, 'success', True):
+    return None
+  headers = getattr(result, 'response_headers', None)
+  pages[url] = record = {
+    'file': fname,
+    'url': getattr(result, 'page_url', None) or getattr(result, 'url', None) or url,
+    **(getattr(result, 'content', None) or {}),
+    'assets': getattr(result, 'asset_counts', None),
+    'lastmod': lastmod,
+    'depth': depth,
+    'etag': header_value(headers, 'etag'),
+    'last_modified': header_value(headers, 'last-modified'),
+    'fetched_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+  }
+  return record
+
+
+class CrawlJournal:
+  """Append-only per-brand progress log (.crawl_journal.jsonl) used by --resume.
+
+  Each completed page and each asset mapping is appended as one JSON line and
+  flushed immediately, so the log survives the process being killed. It is
+  removed once the brand finishes and its caches and manifest are saved.
+  """
+
+  FILENAME = '.crawl_journal.jsonl'
+
+  def __init__(self, out_dir: str, *, resume: bool):
+    self.path = os.path.join(out_dir, self.FILENAME)
+    self.pages: dict = {}
+    self.assets: dict = {}
+    if resume and os.path.exists(self.path):
+      with open(self.path, 'r', encoding='utf-8') as f:
+        for line in f:
+          try:
+            entry = json.loads(line)
+          except ValueError:
+            # Partial last line from a killed process
+            continue
+          if entry.get('type') == 'page':
+            self.pages[entry['url']] = entry.get('record')
+          elif entry.get('type') == 'asset':
+            self.assets[entry['url']] = entry['path']
+      mode = 'a'
+    else:
+      mode = 'w'
+    self._f = open(self.path, mode, encoding='utf-8')
+
+  def _append(self, entry: dict):
+    if self._f.closed:
+      # A late asset callback after the brand finished
+      return
+    self._f.write(json.dumps(entry) + '\n')
+    self._f.flush()
+
+  def page(self, url: str, record: dict | None):
+    self.pages[url] = record
+    self._append({'type': 'page', 'url': url, 'record': record})
+
+  def asset(self, normalized_url: str, relative_path: str):
+    self._append({'type': 'asset', 'url': normalized_url, 'path': relative_path})
+
+  def close(self, *, complete: bool):
+    self._f.close()
+    if complete:
+      try:
+        os.remove(self.path)
+      except OSError:
+        pass
+
+
+def resume_from_journal(slug: str, journal: CrawlJournal, urls: list[str], pages: dict) -> list[str]:
+  """Restore journaled progress into the manifest/asset cache and drop finished URLs.
+
+  Only pages journaled with a record are finished; failed renders (record None)
+  stay in the list so --resume retries them.
+  """
+  for url, record in journal.pages.items():
+    if record:
+      pages[url] = record
+  _assets().cache.update(journal.assets)
+  remaining = [u for u in urls if not journal.pages.get(u)]
+  if journal.pages:
+    print(f"[{slug}] Resuming: {len(urls) - len(remaining)} pages already done, {len(remaining)} remaining")
+  return remaining
+
+
+def flush_crawl_state(out_dir: str, pages: dict, *, assets: bool):
+  """Persist the crawl manifest and (when downloading) the asset caches"""
+  save_crawl_manifest(out_dir, pages)
+  if assets:
+    save_asset_cache(out_dir)
+    save_asset_hash_index(out_dir)
+
+
+async def flush_periodically(out_dir: str, pages: dict, *, assets: bool, interval: float):
+  """Flush crawl state every `interval` seconds until cancelled"""
+  while True:
+    await asyncio.sleep(interval)
+    flush_crawl_state(out_dir, pages, assets=assets)
+
+
+async def page_unchanged(session, url: str, record: dict, lastmod: str | None) -> bool:
+  """Decide from the sitemap lastmod, or a conditional GET, whether a recorded page can be skipped"""
+  if lastmod and record.get('lastmod') == lastmod:
+    return True
+  etag = record.get('etag')
+  last_modified = record.get('last_modified')
+  if not (etag or last_modified):
+    return False
+  headers = {}
+  if etag:
+    headers['If-None-Match'] = etag
+  if last_modified:
+    headers['If-Modified-Since'] = last_modified
+  try:
+    async with session.get(url, headers=headers) as resp:
+      if resp.status == 304:
+        return True
+      # Some servers ignore conditional headers but still report stable validators
+      if resp.status == 200:
+        if etag and resp.headers.get('etag') == etag:
+          return True
+        if not etag and last_modified and resp.headers.get('last-modified') == last_modified:
+          return True
   except Exception:
-    return []
-  ns = {'sm': 'http://www.sitemaps.org/schemas/sitemap/0.9'}
-  urls: list[str] = []
-  # urlset
-  for loc in tree.findall('.//sm:url/sm:loc', ns):
-    if loc.text:
-      urls.append(loc.text.strip())
-  # sitemapindex (one level deep)
-  for loc in tree.findall('.//sm:sitemap/sm:loc', ns):
-    if loc.text:
-      urls.extend(fetch_sitemap(loc.text.strip(), timeout))
-  return urls
+    pass
+  return False
+
+
+def link_discovered_pages(pages: dict, sitemap_urls: list[str], max_depth: int) -> dict[str, int]:
+  """Manifest pages that were reached through links rather than the sitemap, mapped to their recorded depth"""
+  seeds = {normalize_page_url(u) for u in sitemap_urls}
+  linked = {}
+  for url, rec in pages.items():
+    # Records from before depths were kept count as one link away
+    depth = rec.get('depth') or 1
+    if depth <= max_depth and normalize_page_url(url) not in seeds:
+      linked[url] = depth
+  return linked
+
+
+async def select_changed_urls(slug: str, urls: list[str], lastmods: dict, pages: dict, out_dir: str, *, timeout: float = 10.0, concurrency: int = 8) -> list[str]:
+  """Drop URLs whose page is on disk and unchanged since the recorded crawl"""
+  candidates = [u for u in urls if u in pages and os.path.exists(os.path.join(out_dir, pages[u].get('file') or safe_name(u)))]
+  if not candidates:
+    return urls
+  sem = asyncio.Semaphore(concurrency)
+  async with aiohttp.ClientSession(
+    timeout=aiohttp.ClientTimeout(total=timeout),
+    headers={'User-Agent': USER_AGENT},
+  ) as session:
+    async def check(u):
+      async with sem:
+        return await page_unchanged(session, u, pages[u], lastmods.get(u))
+    verdicts = await asyncio.gather(*(check(u) for u in candidates))
+  unchanged = set()
+  for u, same in zip(candidates, verdicts):
+    if same:
+      unchanged.add(u)
+      if lastmods.get(u):
+        pages[u]['lastmod'] = lastmods[u]
+  print(f"[{slug}] Incremental: {len(unchanged)} unchanged, {len(urls) - len(unchanged)} to crawl")
+  return [u for u in urls if u not in unchanged]
+
+
+def make_crawler_strategy(*, stealth: bool, undetected: bool, headless: bool, user_agent: str | None):
+  """Build the (BrowserConfig, strategy) pair for one browser instance"""
+  headers = {"User-Agent": user_agent} if user_agent else None
+  bcfg = BrowserConfig(enable_stealth=stealth, headless=headless, headers=headers, verbose=False)
+  adapter = UndetectedAdapter() if undetected else PlaywrightAdapter()
+  strategy = AsyncPlaywrightCrawlerStrategy(browser_config=bcfg, browser_adapter=adapter)
+  return bcfg, strategy
+
+
+# Render errors that mean the browser itself is gone, not just the page
+BROWSER_GONE = re.compile(
+  r'(?:browser|context|target)(?: page, context or browser)? (?:has been |was )?closed|browser (?:has )?(?:crashed|disconnected)|connection closed',
+  re.IGNORECASE,
+)
+
+
+class CrawlerPool:
+  """Fixed set of long-lived AsyncWebCrawler instances shared across page tasks.
+
+  Browsers are started lazily on first use and handed out round-robin; each
+  crawler serves several concurrent `arun` calls (one tab per call), so the
+  pool size only bounds how many Chromium processes are running. A crawler
+  whose browser crashed or was closed is dropped from the pool (see `run`),
+  and the next `get` starts a replacement.
+  """
+
+  def __init__(self, size: int, *, stealth: bool, undetected: bool, headless: bool, user_agent: str | None):
+    self.size = max(1, size)
+    self.stealth = stealth
+    self.undetected = undetected
+    self.headless = headless
+    self.user_agent = user_agent
+    self._crawlers: list = []
+    self._next = 0
+    self._lock = asyncio.Lock()
+
+  async def get(self):
+    """Return the next crawler, starting a new browser if the pool is not yet full"""
+    async with self._lock:
+      if len(self._crawlers) < self.size:
+        bcfg, strategy = make_crawler_strategy(
+          stealth=self.stealth, undetected=self.undetected,
+          headless=self.headless, user_agent=self.user_agent,
+        )
+        crawler = AsyncWebCrawler(crawler_strategy=strategy, config=bcfg)
+        await crawler.start()
+        self._crawlers.append(crawler)
+        return crawler
+      crawler = self._crawlers[self._next % len(self._crawlers)]
+      self._next += 1
+      return crawler
+
+  async def discard(self, crawler):
+    """Drop a crawler whose browser is gone (a no-op if another task already did)"""
+    async with self._lock:
+      if crawler not in self._crawlers:
+        return
+      self._crawlers.remove(crawler)
+    try:
+      await crawler.close()
+    except Exception:
+      pass
+
+  async def run(self, url: str, config):
+    """arun on a pooled crawler; if its browser is gone, replace it and retry the page once.
+
+    crawl4ai reports page errors as failed results, so an exception from arun,
+    or a failed result naming a closed browser, means the crawler is dead.
+    """
+    for attempt in range(2):
+      crawler = await self.get()
+      try:
+        result = await crawler.arun(url=url, config=config)
+      except Exception:
+        await self.discard(crawler)
+        if attempt:
+          raise
+        continue
+      if getattr(result, 'success', True) or not BROWSER_GONE.search(getattr(result, 'error_message', None) or ''):
+        return result
+      await self.discard(crawler)
+    return result
+
+  async def close(self):
+    """Shut down every browser in the pool"""
+    async with self._lock:
+      crawlers, self._crawlers = self._crawlers, []
+    for crawler in crawlers:
+      try:
+        await crawler.close()
+      except Exception as e:
+        print(f"Failed to close pooled browser: {e}")
+
+
+# Links to these are assets, not pages, and never enter the crawl frontier
+NON_PAGE_EXTENSIONS = re.compile(
+  r'\.(?:jpe?g|png|gif|webp|svg|ico|bmp|avif|pdf|txt|docx?|xlsx?|pptx?|zip|rar|csv|xml|json|mp4|mp3|webm|css|js|woff2?|ttf)$',
+  re.IGNORECASE,
+)
+
+
+class CrawlFrontier:
+  """Breadth-first crawl frontier deduplicated by normalised page URL.
+
+  Seeds (sitemap URLs) enter at depth 0; same-origin links found on a page at
+  depth d enter at d + 1 while d < max_depth. The queue is a priority queue on
+  (depth, insertion order), so shallower pages are always fetched first.
+  `max_pages` (0 = unlimited) caps how many pages are admitted in total.
+  Seen URLs are kept as 64-bit hashes (UrlSet), not strings.
+  """
+
+  def __init__(self, origin: str, *, max_depth: int, max_pages: int = 0):
+    self.origin = origin
+    self.max_depth = max(0, max_depth)
+    self.max_pages = max(0, max_pages or 0)
+    self.queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+    self.admitted = 0
+    self.discovered = 0
+    self._seen = UrlSet()
+    self._seq = 0
+
+  def mark_seen(self, urls):
+    """Treat URLs as already handled (e.g. skipped by --resume/--incremental)"""
+    self._seen.update(normalize_page_url(u) for u in urls)
+
+  def add(self, url: str, depth: int, *, force: bool = False) -> bool:
+    """Queue a URL unless it is off-origin, already seen or over budget (force skips the seen check)"""
+    if not same_origin(url, self.origin):
+      return False
+    key = normalize_page_url(url)
+    if key in self._seen and not force:
+      return False
+    if self.max_pages and self.admitted >= self.max_pages:
+      return False
+    self._seen.add(key)
+    self.admitted += 1
+    self.queue.put_nowait((depth, self._seq, url))
+    self._seq += 1
+    return True
+
+  def add_links(self, result, depth: int) -> int:
+    """Queue the same-origin page links of a rendered result; returns how many were new"""
+    if depth >= self.max_depth:
+      return 0
+    base = getattr(result, 'url', None) or self.origin
+    links = getattr(result, 'links', None) or {}
+    added = 0
+    for link in links.get('internal', []) or []:
+      href = link.get('href') if isinstance(link, dict) else link
+      if not href:
+        continue
+      try:
+        url = urldefrag(urljoin(base, href))[0]
+        path = urlparse(url).path
+      except ValueError:
+        # Malformed href (e.g. an unbalanced IPv6 host)
+        continue
+      if NON_PAGE_EXTENSIONS.search(path):
+        continue
+      if self.add(url, depth + 1):
+        added += 1
+    self.discovered += added
+    return added
+
+
+class CrawlBudget:
+  """Page budget shared by brands crawled concurrently, plus per-origin politeness.
+
+  `total` caps renders in flight across all brands (0 = no cap);
+  `min_interval` is the minimum gap in seconds between starting two
+  requests to the same origin. `shares` is how many brands run at once:
+  a bulk reservation (a --many dispatcher) gets at most total / shares
+  permits, so one brand cannot hold the whole budget.
+  """
+
+  def __init__(self, total: int = 0, min_interval: float = 0.0, shares: int = 1):
+    self.total = max(0, total)
+    self.min_interval = max(0.0, min_interval)
+    self.share = max(1, self.total // max(1, shares))
+    self._free = self.total
+    self._cond = asyncio.Condition()
+    self._origin_locks: dict[str, asyncio.Lock] = {}
+    self._last_start: dict[str, float] = {}
+
+  async def acquire(self, n: int = 1) -> int:
+    """Take up to n permits (at most one brand's share) as soon as any are free; returns how many were taken"""
+    if not self.total:
+      return 0
+    async with self._cond:
+      await self._cond.wait_for(lambda: self._free > 0)
+      n = max(1, min(n, self.share, self._free))
+      self._free -= n
+    return n
+
+  async def release(self, n: int = 1):
+    if not n:
+      return
+    async with self._cond:
+      self._free += n
+      self._cond.notify_all()
+
+  async def wait_politely(self, url: str):
+    """Delay until at least min_interval has passed since the last request to this origin"""
+    if not self.min_interval:
+      return
+    origin = url_origin(url)[1]
+    lock = self._origin_locks.setdefault(origin, asyncio.Lock())
+    async with lock:
+      wait = self._last_start.get(origin, 0.0) + self.min_interval - time.monotonic()
+      if wait > 0:
+        await asyncio.sleep(wait)
+      self._last_start[origin] = time.monotonic()
+
+  @asynccontextmanager
+  async def slot(self, url: str):
+    # Wait out the origin delay first, so a brand pausing for its own site holds no global permit
+    await self.wait_politely(url)
+    n = await self.acquire(1)
+    try:
+      yield
+    finally:
+      await self.release(n)
 
 
 def safe_name(u: str) -> str:
-  p = urlparse(u)
+  # Canonical form, so URLs the frontier treats as one page also share a file
+  p = urlparse(normalize_page_url(u))
   path = p.path.rstrip('/') or '/index'
   name = path.replace('/', '_')
   if p.query:
@@ -500,39 +1145,88 @@ async def crawl_brand(
     capture_network: bool,
     capture_console: bool,
     download_assets: bool = False,
+    browser_pool: int = 2,
+    asset_concurrency: int = 8,
+    asset_per_host: int = 4,
+    asset_timeout: float = 10.0,
+    incremental: bool = False,
+    resume: bool = False,
+    flush_interval: float = 60.0,
+    budget: CrawlBudget | None = None,
+    follow_links: bool = False,
+    max_depth: int = 2,
+    write_queue: int = 32,
+    write_threads: int = 4,
+    capture_format: str = 'json',
+    search_index: bool = False,
+    shared_assets: bool = False,
+    compact_cache: bool = False,
 ):
   os.makedirs(out_dir, exist_ok=True)
+  # Fresh per-brand asset state (scoped to this brand's task context)
+  _asset_state.set(AssetState())
 
   # Handle asset cache for deduplication
+  downloader = None
+  asset_tasks: set[asyncio.Task] = set()
   if download_assets:
-    # Load existing cache to avoid re-downloading assets from previous runs
-    load_asset_cache(out_dir)
-    print(f"[{slug}] Asset downloading enabled")
+    downloader = open_brand_assets(slug, out_dir, max_concurrent=asset_concurrency, limit_per_host=asset_per_host, timeout=asset_timeout, shared=shared_assets, compact_cache=compact_cache)
+  capture_store = CaptureStore(out_dir) if (capture_network or capture_console) and capture_format == 'stream' else None
   # seed from sitemap; if none, start with origin
-  urls = discover_sitemap_urls(origin)
+  lastmods = await discover_sitemap_entries(origin, cache_dir=out_dir)
+  urls = list(lastmods)
   if not urls:
     urls = [origin]
   # limit pages if requested (0 => no limit)
   if max_pages and max_pages > 0:
     urls = urls[:max_pages]
+  all_urls = list(urls)
+
+  pages = load_crawl_manifest(out_dir)
+  journal = CrawlJournal(out_dir, resume=resume)
+  if resume:
+    urls = resume_from_journal(slug, journal, urls, pages)
+  if download_assets:
+    _assets().journal = journal
+  # With --followLinks, pages found through links are not in the sitemap: check them too, at their recorded depth
+  linked = link_discovered_pages(pages, all_urls, max_depth) if incremental and follow_links else {}
+  if incremental:
+    urls = await select_changed_urls(slug, urls + list(linked), lastmods, pages, out_dir)
 
   sem = asyncio.Semaphore(concurrency)
 
+  run_cfg = CrawlerRunConfig(
+    page_timeout=int(wait_time * 1000),  # Convert seconds to milliseconds
+    delay_before_return_html=delay_before_return_html,
+    capture_network_requests=capture_network,
+    capture_console_messages=capture_console,
+  )
+
+  # Long-lived browsers shared by all pages of this brand (0 => legacy per-URL launch)
+  pools: dict[tuple[bool, bool], CrawlerPool] = {}
+  if browser_pool and browser_pool > 0:
+    pool_size = min(browser_pool, concurrency)
+    if progressive:
+      pools[(False, False)] = CrawlerPool(pool_size, stealth=False, undetected=False, headless=headless, user_agent=user_agent)
+      pools[(False, True)] = CrawlerPool(pool_size, stealth=False, undetected=True, headless=headless, user_agent=user_agent)
+    else:
+      pools[(enable_stealth, use_undetected)] = CrawlerPool(pool_size, stealth=enable_stealth, undetected=use_undetected, headless=headless, user_agent=user_agent)
+
   async def run_with_config(url: str, *, stealth: bool, undetected: bool):
-    headers = {"User-Agent": user_agent} if user_agent else None
-    bcfg = BrowserConfig(enable_stealth=stealth, headless=headless, headers=headers, verbose=False)
-    adapter = UndetectedAdapter() if undetected else PlaywrightAdapter()
-    strategy = AsyncPlaywrightCrawlerStrategy(browser_config=bcfg, browser_adapter=adapter)
-    run_cfg = CrawlerRunConfig(
-      page_timeout=int(wait_time * 1000),  # Convert seconds to milliseconds
-      delay_before_return_html=delay_before_return_html,
-      capture_network_requests=capture_network,
-      capture_console_messages=capture_console,
-    )
+    if budget is not None:
+      async with budget.slot(url):
+        return await render(url, stealth=stealth, undetected=undetected)
+    return await render(url, stealth=stealth, undetected=undetected)
+
+  async def render(url: str, *, stealth: bool, undetected: bool):
+    pool = pools.get((stealth, undetected))
+    if pool is not None:
+      return await pool.run(url, run_cfg)
+    bcfg, strategy = make_crawler_strategy(stealth=stealth, undetected=undetected, headless=headless, user_agent=user_agent)
     async with AsyncWebCrawler(crawler_strategy=strategy, config=bcfg) as crawler:
       return await crawler.arun(url=url, config=run_cfg)
 
-  async def fetch_and_write(url: str):
+  async def fetch_and_write(url: str, depth: int = 0):
     async with sem:
       try:
         result = None
@@ -546,91 +1240,249 @@ async def crawl_brand(
         else:
           result = await run_with_config(url, stealth=enable_stealth, undetected=use_undetected)
 
-        md = getattr(result, 'markdown', '') or ''
-        fname = safe_name(url)
-        # Write markdown
-        # Extract asset URLs present in markdown for this page
-        asset_urls = []
-        try:
-          # Find image markdown: ![alt](url)
-          img_urls = re.findall(r'!\[[^\]]*\]\(([^\)]+)\)', md)
-          asset_urls.extend(img_urls)
-
-          # Find PDF links: [text](url.pdf "title") - extract just the URL part
-          pdf_matches = re.findall(r'\[[^\]]*\]\(([^\s\)]*\.pdf)(?:\s[^\)]*)?\)', md, re.IGNORECASE)
-          asset_urls.extend(pdf_matches)
-
-          # Find TXT links: [text](url.txt "title") - extract just the URL part
-          txt_matches = re.findall(r'\[[^\]]*\]\(([^\s\)]*\.txt)(?:\s[^\)]*)?\)', md, re.IGNORECASE)
-          asset_urls.extend(txt_matches)
-
-          # Find other file types: [text](url.ext "title") - extract just the URL part
-          other_extensions = ['doc', 'docx', 'xls', 'xlsx', 'ppt', 'pptx', 'zip', 'rar', 'csv', 'xml', 'json']
-          other_matches = []
-          for ext in other_extensions:
-            matches = re.findall(rf'\[[^\]]*\]\(([^\s\)]*\.{ext})(?:\s[^\)]*)?\)', md, re.IGNORECASE)
-            other_matches.extend(matches)
-          asset_urls.extend(other_matches)
-
-        except Exception:
-          asset_urls = []
-
-        # Download assets if requested
-        if download_assets and asset_urls:
-          assets_dir = Path(out_dir) / 'assets'
-          assets_dir.mkdir(exist_ok=True)
-
-          # Download all assets (images, PDFs, TXT files) and update markdown
-          for asset_url in asset_urls:
-            local_path = download_asset(asset_url, assets_dir, getattr(result, 'url', url))
-            if local_path:
-              md = md.replace(f']({asset_url})', f']({local_path})')
-
-        if asset_urls:
-          meta = {
-            "page_url": getattr(result, 'url', url),
-            "asset_urls": asset_urls,
-            "image_urls": img_urls,
-            "pdf_urls": pdf_matches,
-            "txt_urls": txt_matches,
-            "other_urls": other_matches
-          }
-          meta_name = fname.replace('.md', '.assets.json')
-          with open(os.path.join(out_dir, meta_name), 'w', encoding='utf-8') as fim:
-            json.dump(meta, fim, indent=2)
-
-        with open(os.path.join(out_dir, fname), 'w', encoding='utf-8') as f:
-          f.write(md)
-        # Optionally write capture data alongside markdown
-        if capture_network or capture_console:
-          capture = {
-            "url": getattr(result, 'url', url),
-            "network_requests": getattr(result, 'network_requests', []) or [],
-            "console_messages": getattr(result, 'console_messages', []) or [],
-          }
-          cap_name = fname.replace('.md', '.capture.json')
-          with open(os.path.join(out_dir, cap_name), 'w', encoding='utf-8') as fcap:
-            json.dump(capture, fcap, indent=2)
-        print(f'[{slug}] OK {url}')
+        job = PageWrite(out_dir, url, result, capture=capture_network or capture_console, store=capture_store)
+        await writer.put(job, partial(
+          page_written, slug, job, url,
+          pages=pages, lastmod=lastmods.get(url), journal=journal,
+          downloader=downloader, asset_tasks=asset_tasks, depth=depth,
+        ))
+        return result
+      except Exception as e:
+        print(f'[{slug}] ERROR {url} -> {e}')
+        return None
+
+  # Sitemap URLs seed the frontier; with --followLinks rendered pages feed it more
+  frontier = CrawlFrontier(origin, max_depth=max_depth if follow_links else 0, max_pages=max_pages)
+  frontier.mark_seen(all_urls)
+  frontier.mark_seen(linked)
+  for u in urls:
+    frontier.add(u, linked.get(u, 0), force=True)
+
+  async def worker():
+    while True:
+      depth, _, url = await frontier.queue.get()
+      try:
+        result = await fetch_and_write(url, depth)
+        if result is not None:
+          frontier.add_links(result, depth)
       except Exception as e:
+        # A dead worker would leave queued URLs without task_done() and hang queue.join()
         print(f'[{slug}] ERROR {url} -> {e}')
+      finally:
+        frontier.queue.task_done()
 
-  tasks = [fetch_and_write(u) for u in urls if same_origin(u, origin)]
-  await asyncio.gather(*tasks)
+  async def crawl_frontier():
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, concurrency))]
+    try:
+      await frontier.queue.join()
+    finally:
+      for w in workers:
+        w.cancel()
+    if follow_links:
+      print(f"[{slug}] Frontier: {frontier.admitted} pages crawled ({frontier.discovered} discovered via links)")
+  flusher = asyncio.create_task(flush_periodically(out_dir, pages, assets=download_assets, interval=flush_interval))
+  completed = False
+  writer = PageWriter(slug, max_pending=write_queue, workers=write_threads)
+  try:
+    async with AsyncExitStack() as stack:
+      # Exit order: drain page writes, then their asset downloads, then close the HTTP pool
+      if downloader is not None:
+        await stack.enter_async_context(downloader)
+        stack.push_async_callback(drain_asset_tasks, asset_tasks)
+      await stack.enter_async_context(writer)
+      await crawl_frontier()
+    completed = True
+  finally:
+    flusher.cancel()
+    for pool in pools.values():
+      await pool.close()
+    flush_crawl_state(out_dir, pages, assets=download_assets)
+    _assets().journal = None
+    # Keep the journal for --resume unless every page was attempted
+    journal.close(complete=completed)
 
-  # Print asset download statistics and save cache
   if download_assets:
-    stats = get_asset_stats()
-    total_assets = stats['downloaded'] + stats['cached'] + stats['skipped']
-    if total_assets > 0:
-      print(f"[{slug}] Asset Summary: {stats['downloaded']} downloaded, {stats['cached']} cached (duplicates avoided), {stats['skipped']} skipped")
-      print(f"[{slug}] File Types: {stats['images']} images, {stats['pdfs']} PDFs, {stats['txt_files']} TXT files, {stats['other_files']} other files")
-
-    # Clean up any remaining duplicates
-    cleanup_duplicate_assets(out_dir)
-
-    # Save cache for future runs
-    save_asset_cache(out_dir)
+    close_brand_assets(slug, out_dir)
+  if search_index:
+    # Pick up new/changed pages once their asset links point at local files
+    await asyncio.to_thread(update_search_index, out_dir, verbose=True)
+
+
+def open_brand_assets(slug: str, out_dir: str, *, max_concurrent: int, limit_per_host: int, timeout: float, shared: bool = False, compact_cache: bool = False) -> AssetDownloader:
+  """Load the brand's asset caches and return a downloader for its pages"""
+  # Load existing cache to avoid re-downloading assets from previous runs
+  load_asset_cache(out_dir, compact=compact_cache)
+  (Path(out_dir) / 'assets').mkdir(exist_ok=True)
+  load_asset_hash_index(out_dir)
+  if shared:
+    # output_markdown/_blobs, shared by every brand
+    _assets().blobs = BlobStore.open(Path(out_dir).parent / BLOB_STORE_DIR)
+  print(f"[{slug}] Asset downloading enabled")
+  return AssetDownloader(max_concurrent=max_concurrent, limit_per_host=limit_per_host, timeout=timeout)
+
+
+async def drain_asset_tasks(asset_tasks: set):
+  """Let outstanding page asset downloads finish (before the HTTP pool is closed)"""
+  while asset_tasks:
+    await asyncio.gather(*list(asset_tasks))
+
+
+def close_brand_assets(slug: str, out_dir: str):
+  """Print asset download statistics and save the caches"""
+  stats = get_asset_stats()
+  total_assets = stats['downloaded'] + stats['cached'] + stats['skipped']
+  if total_assets > 0:
+    print(f"[{slug}] Asset Summary: {stats['downloaded']} downloaded, {stats['cached']} cached (duplicates avoided), {stats['skipped']} skipped")
+    print(f"[{slug}] File Types: {stats['images']} images, {stats['pdfs']} PDFs, {stats['txt_files']} TXT files, {stats['other_files']} other files")
+
+  # Save cache for future runs
+  save_asset_cache(out_dir)
+  save_asset_hash_index(out_dir)
+
+
+class PageWrite:
+  """A rendered page reduced to what has to reach disk.
+
+  Built on the event loop as soon as a result arrives, so the (large) result
+  object can be dropped while the write waits in the PageWriter queue. The
+  network/console capture is held as compact JSON and goes either to a
+  sibling `.capture.json` or, when a CaptureStore is given, to the brand's
+  compressed capture stream. `success` and `response_headers` are kept for
+  record_page.
+  """
+
+  def __init__(self, out_dir: str, url: str, result, *, capture: bool, store: CaptureStore | None = None):
+    self.url = url
+    self.page_url = getattr(result, 'url', None) or url
+    self.success = getattr(result, 'success', True)
+    self.response_headers = getattr(result, 'response_headers', None)
+    self.md = getattr(result, 'markdown', '') or ''
+    self.fname = safe_name(url)
+    self.md_path = os.path.join(out_dir, self.fname)
+    self.out_dir = out_dir
+    # Classify every markdown link in one pass
+    links = extract_asset_links(self.md)
+    self.asset_urls = links['all']
+    self.asset_counts = {kind: len(links[kind]) for kind in ('image', 'pdf', 'txt', 'other')}
+    self.content = None
+    self.meta_json = None
+    if self.asset_urls:
+      self.meta_json = json.dumps({
+        "page_url": self.page_url,
+        "asset_urls": self.asset_urls,
+        "image_urls": links['image'],
+        "pdf_urls": links['pdf'],
+        "txt_urls": links['txt'],
+        "other_urls": links['other']
+      }, indent=2)
+    self.capture_json = None
+    self.store = store
+    if capture:
+      network = getattr(result, 'network_requests', []) or []
+      console = getattr(result, 'console_messages', []) or []
+      self.capture_counts = (len(network), len(console))
+      self.capture_json = json.dumps({
+        "url": self.page_url,
+        "network_requests": network,
+        "console_messages": console,
+      }, separators=(',', ':'))
+
+  def commit(self):
+    """Blocking file writes; runs on a PageWriter thread"""
+    if self.meta_json is not None:
+      with open(os.path.join(self.out_dir, self.fname.replace('.md', '.assets.json')), 'w', encoding='utf-8') as fim:
+        fim.write(self.meta_json)
+    with open(self.md_path, 'w', encoding='utf-8') as f:
+      f.write(self.md)
+    self.content = page_content_fields(self.md_path, self.md)
+    if self.capture_json is not None and self.store is not None:
+      requests, console = self.capture_counts
+      self.store.append(self.fname, self.capture_json, url=self.page_url, requests=requests, console=console)
+    elif self.capture_json is not None:
+      with open(os.path.join(self.out_dir, self.fname.replace('.md', '.capture.json')), 'w', encoding='utf-8') as fcap:
+        fcap.write(self.capture_json)
+
+
+class PageWriter:
+  """Bounded producer/consumer stage between page rendering and disk writes.
+
+  Producers `await put(job)`; once `max_pending` jobs are waiting, put blocks,
+  which stalls the result loop and, in turn, the dispatcher. `workers`
+  consumers hand each job's blocking I/O to a thread pool and then run the
+  job's on_written callback back on the event loop.
+  """
+
+  def __init__(self, slug: str, *, max_pending: int = 32, workers: int = 4):
+    self.slug = slug
+    self.workers = max(1, workers)
+    self._queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, max_pending))
+    self._executor = None
+    self._consumers: list[asyncio.Task] = []
+
+  async def __aenter__(self):
+    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f'write-{self.slug}')
+    self._consumers = [asyncio.create_task(self._consume()) for _ in range(self.workers)]
+    return self
+
+  async def __aexit__(self, exc_type, exc, tb):
+    try:
+      # Drain only on a clean exit: after cancellation (SIGTERM) the consumers
+      # are gone and queued jobs would never be marked done
+      if exc_type is None:
+        await self._queue.join()
+    finally:
+      for c in self._consumers:
+        c.cancel()
+      await asyncio.gather(*self._consumers, return_exceptions=True)
+      self._executor.shutdown(wait=True, cancel_futures=True)
+
+  async def put(self, job: PageWrite, on_written=None):
+    await self._queue.put((job, on_written))
+
+  async def _consume(self):
+    loop = asyncio.get_running_loop()
+    while True:
+      job, on_written = await self._queue.get()
+      try:
+        await loop.run_in_executor(self._executor, job.commit)
+        if on_written is not None:
+          on_written()
+      except Exception as e:
+        print(f'[{self.slug}] ERROR write {job.url} -> {e}')
+      finally:
+        self._queue.task_done()
+
+
+def page_written(slug: str, job: PageWrite, key: str, *, pages: dict, lastmod: str | None, journal: CrawlJournal | None, downloader: AssetDownloader | None, asset_tasks: set, depth: int = 0):
+  """Bookkeeping once a page is on disk: queue its asset downloads and record it in manifest/journal"""
+  record = record_page(pages, key, job.fname, job, lastmod, depth)
+  localizing = downloader is not None and bool(job.asset_urls)
+  # A page with assets is only journaled once its links are local, so --resume redoes it if killed before
+  if journal is not None and not (localizing and record is not None):
+    journal.page(key, record)
+  # Download assets in the background; the markdown is rewritten with local paths when they land
+  if localizing:
+    task = asyncio.create_task(localize_page_assets(
+      downloader, job.md_path, job.md, job.asset_urls, Path(job.out_dir) / 'assets', job.page_url,
+    ))
+    asset_tasks.add(task)
+    task.add_done_callback(asset_tasks.discard)
+    if record is not None:
+      task.add_done_callback(partial(page_rewritten, job.md_path, key, record, journal))
+  print(f'[{slug}] OK {key}')
+
+
+def page_rewritten(md_path: str, key: str, record: dict, journal: CrawlJournal | None, task: asyncio.Task):
+  """Once a page's assets are local: refresh its manifest size/hash and journal the page as done"""
+  if task.cancelled() or task.exception() is not None:
+    return
+  if task.result() is not None:
+    try:
+      record.update(page_content_fields(md_path, task.result()))
+    except OSError:
+      pass
+  if journal is not None:
+    journal.page(key, record)
 
 
 async def crawl_brand_many(
@@ -658,30 +1510,75 @@ async def crawl_brand_many(
     max_retries: int,
     check_robots: bool,
     include_pdfs: bool,
+    incremental: bool = False,
+    resume: bool = False,
+    flush_interval: float = 60.0,
+    budget: CrawlBudget | None = None,
+    download_assets: bool = False,
+    asset_concurrency: int = 8,
+    asset_per_host: int = 4,
+    asset_timeout: float = 10.0,
+    write_queue: int = 32,
+    write_threads: int = 4,
+    capture_format: str = 'json',
+    search_index: bool = False,
+    shared_assets: bool = False,
+    compact_cache: bool = False,
 ):
   os.makedirs(out_dir, exist_ok=True)
+  # Fresh per-brand asset state (scoped to this brand's task context)
+  _asset_state.set(AssetState())
   # seed list from sitemap (fallback to origin)
-  urls = discover_sitemap_urls(origin)
+  lastmods = await discover_sitemap_entries(origin, cache_dir=out_dir)
+  urls = list(lastmods)
   if not urls:
     urls = [origin]
   if max_pages and max_pages > 0:
     urls = urls[:max_pages]
 
-  headers = {"User-Agent": user_agent} if user_agent else None
-  bcfg = BrowserConfig(enable_stealth=enable_stealth, headless=headless, headers=headers, verbose=False)
-  adapter = UndetectedAdapter() if use_undetected else PlaywrightAdapter()
-  crawler_strategy = AsyncPlaywrightCrawlerStrategy(browser_config=bcfg, browser_adapter=adapter)
+  pages = load_crawl_manifest(out_dir)
+  journal = CrawlJournal(out_dir, resume=resume)
+  if resume:
+    urls = resume_from_journal(slug, journal, urls, pages)
+  if incremental:
+    urls = await select_changed_urls(slug, urls, lastmods, pages, out_dir)
+  if not urls:
+    save_crawl_manifest(out_dir, pages)
+    journal.close(complete=True)
+    return
 
-  # Rate limiter and monitor
-  rl = RateLimiter(base_delay=(base_delay_low, base_delay_high), max_delay=max_delay, max_retries=max_retries)
+  # Asset downloads run alongside page fetching, with the same cache/dedup as crawl_brand
+  downloader = None
+  asset_tasks: set[asyncio.Task] = set()
+  if download_assets:
+    downloader = open_brand_assets(slug, out_dir, max_concurrent=asset_concurrency, limit_per_host=asset_per_host, timeout=asset_timeout, shared=shared_assets, compact_cache=compact_cache)
+    if resume:
+      # load_asset_cache replaced the cache resume_from_journal restored into
+      _assets().cache.update(journal.assets)
+    _assets().journal = journal
+  capture = capture_network or capture_console
+  capture_store = CaptureStore(out_dir) if capture and capture_format == 'stream' else None
+
+  bcfg, crawler_strategy = make_crawler_strategy(stealth=enable_stealth, undetected=use_undetected, headless=headless, user_agent=user_agent)
+
+  # The dispatcher schedules its own sessions, so reserve them from the shared budget up front
+  # (whatever is free, up to this brand's share) and size the dispatcher to the grant
+  sessions = semaphore_count if dispatcher_type == 'semaphore' else max_permit
+  reserved = await budget.acquire(sessions) if budget is not None else 0
+  if reserved:
+    sessions = reserved
+
+  # Rate limiter and monitor; the limiter spaces requests per domain, which also enforces --originDelay
+  min_delay = budget.min_interval if budget is not None else 0.0
+  rl = RateLimiter(base_delay=(max(base_delay_low, min_delay), max(base_delay_high, min_delay)), max_delay=max_delay, max_retries=max_retries)
   # Use TEXT display to reduce fancy unicode arrows in console
   monitor = CrawlerMonitor(max_visible_rows=15, display_mode=DisplayMode.TEXT)
 
   # Dispatcher choice
   if dispatcher_type == 'semaphore':
-    dispatcher = SemaphoreDispatcher(semaphore_count=semaphore_count, rate_limiter=rl, monitor=monitor)
+    dispatcher = SemaphoreDispatcher(semaphore_count=sessions, rate_limiter=rl, monitor=monitor)
   else:
-    dispatcher = MemoryAdaptiveDispatcher(memory_threshold_percent=memory_threshold, max_session_permit=max_permit, rate_limiter=rl, monitor=monitor)
+    dispatcher = MemoryAdaptiveDispatcher(memory_threshold_percent=memory_threshold, max_session_permit=sessions, rate_limiter=rl, monitor=monitor)
 
   # URL-specific configs (PDF vs HTML)
   run_default = CrawlerRunConfig(
@@ -704,47 +1601,52 @@ async def crawl_brand_many(
       run_default,
     ]
 
-  async with AsyncWebCrawler(crawler_strategy=crawler_strategy, config=bcfg) as crawler:
-    if stream:
-      async for result in await crawler.arun_many(urls=urls, config=configs, dispatcher=dispatcher):
-        await _write_result(slug, out_dir, result)
-    else:
-      results = await crawler.arun_many(urls=urls, config=configs, dispatcher=dispatcher)
-      for result in results:
-        await _write_result(slug, out_dir, result)
+  flusher = asyncio.create_task(flush_periodically(out_dir, pages, assets=download_assets, interval=flush_interval))
+  completed = False
+  writer = PageWriter(slug, max_pending=write_queue, workers=write_threads)
 
+  async def write_result(result):
+    try:
+      url = getattr(result, 'url', 'unknown')
+      job = PageWrite(out_dir, url, result, capture=capture, store=capture_store)
+      await writer.put(job, partial(
+        page_written, slug, job, url,
+        pages=pages, lastmod=lastmods.get(url), journal=journal,
+        downloader=downloader, asset_tasks=asset_tasks,
+      ))
+    except Exception as e:
+      print(f'[{slug}] ERROR write result -> {e}')
 
-async def _write_result(slug: str, out_dir: str, result):
   try:
-    url = getattr(result, 'url', 'unknown')
-    md = getattr(result, 'markdown', '') or ''
-    fname = safe_name(url)
-    with open(os.path.join(out_dir, fname), 'w', encoding='utf-8') as f:
-      f.write(md)
-    # Extract image URLs present in markdown for this page (many-mode writer)
-    img_urls = []
-    try:
-      img_urls = re.findall(r'!\[[^\]]*\]\(([^\)]+)\)', md)
-    except Exception:
-      img_urls = []
-    if img_urls:
-      meta = {
-        "page_url": url,
-        "image_urls": img_urls,
-      }
-      meta_name = fname.replace('.md', '.images.json')
-      with open(os.path.join(out_dir, meta_name), 'w', encoding='utf-8') as fim:
-        json.dump(meta, fim, indent=2)
-    net = getattr(result, 'network_requests', None)
-    con = getattr(result, 'console_messages', None)
-    if net or con:
-      capture = {"url": url, "network_requests": net or [], "console_messages": con or []}
-      cap_name = fname.replace('.md', '.capture.json')
-      with open(os.path.join(out_dir, cap_name), 'w', encoding='utf-8') as fcap:
-        json.dump(capture, fcap, indent=2)
-    print(f'[{slug}] OK {url}')
-  except Exception as e:
-    print(f'[{slug}] ERROR write result -> {e}')
+    async with AsyncExitStack() as stack:
+      # Exit order: drain page writes, then their asset downloads, then close the HTTP pool
+      if downloader is not None:
+        await stack.enter_async_context(downloader)
+        stack.push_async_callback(drain_asset_tasks, asset_tasks)
+      await stack.enter_async_context(writer)
+      crawler = await stack.enter_async_context(AsyncWebCrawler(crawler_strategy=crawler_strategy, config=bcfg))
+      if stream:
+        # A full writer queue blocks this loop, which holds back the dispatcher
+        async for result in await crawler.arun_many(urls=urls, config=configs, dispatcher=dispatcher):
+          await write_result(result)
+      else:
+        results = await crawler.arun_many(urls=urls, config=configs, dispatcher=dispatcher)
+        for result in results:
+          await write_result(result)
+    completed = True
+  finally:
+    flusher.cancel()
+    if budget is not None:
+      await budget.release(reserved)
+    flush_crawl_state(out_dir, pages, assets=download_assets)
+    _assets().journal = None
+    journal.close(complete=completed)
+
+  if download_assets:
+    close_brand_assets(slug, out_dir)
+  if search_index:
+    # Pick up new/changed pages once their asset links point at local files
+    await asyncio.to_thread(update_search_index, out_dir, verbose=True)
 
 
 def main():
@@ -752,8 +1654,17 @@ def main():
   parser.add_argument('--brand', help='Single brand slug from brands.json')
   parser.add_argument('--maxPages', type=int, default=0, help='Limit pages per brand (0 = no limit)')
   parser.add_argument('--concurrency', type=int, default=4, help='Concurrent pages per brand')
+  parser.add_argument('--parallelBrands', type=int, default=1, help='Brands crawled concurrently in one process')
+  parser.add_argument('--globalConcurrency', type=int, default=0, help='Max page renders in flight across all brands (0 = no global cap)')
+  parser.add_argument('--originDelay', type=float, default=0.0, help='Minimum seconds between requests to the same origin')
+  parser.add_argument('--browserPool', type=int, default=2, help='Long-lived browsers shared across pages per adapter (0 = launch a browser per page)')
   parser.add_argument('--stealth', action='store_true', help='Enable stealth mode fingerprint hardening (may cause import issues)')
   parser.add_argument('--downloadAssets', action='store_true', help='Download images and PDFs locally and rewrite markdown paths')
+  parser.add_argument('--assetConcurrency', type=int, default=8, help='Max asset downloads in flight per brand')
+  parser.add_argument('--assetPerHost', type=int, default=4, help='Max open asset connections per host')
+  parser.add_argument('--sharedAssets', action='store_true', help='Share identical assets across brands via hard links into output_markdown/_blobs (and skip downloads another brand already has)')
+  parser.add_argument('--compactCache', action='store_true', help='Keep the asset cache as hashed URLs in a binary .asset_cache.bin (fast to load on very large sites; converts .asset_cache.json on first use)')
+  parser.add_argument('--assetTimeout', type=float, default=10.0, help='Per-asset connect/read timeout (s); slow but steady downloads are not cut off')
   parser.add_argument('--undetected', action='store_true', help='Use undetected browser adapter')
   parser.add_argument('--progressive', action='store_true', help='Try stealth first, then undetected if blocked')
   parser.add_argument('--headless', action='store_true', help='Run browser headless (default off)')
@@ -762,6 +1673,7 @@ def main():
   parser.add_argument('--userAgent', type=str, default=None, help='Custom User-Agent header')
   parser.add_argument('--captureNetwork', action='store_true', help='Capture all network requests/responses')
   parser.add_argument('--captureConsole', action='store_true', help='Capture browser console messages')
+  parser.add_argument('--captureFormat', choices=['json', 'stream'], default='json', help="Where captures go: per-page .capture.json, or the brand's compressed stream (.captures/)")
   # arun_many / dispatcher options
   parser.add_argument('--many', action='store_true', help='Use arun_many with dispatcher for multi-URL crawling')
   parser.add_argument('--dispatcher', choices=['memory','semaphore'], default='memory', help='Dispatcher type for arun_many')
@@ -775,19 +1687,56 @@ def main():
   parser.add_argument('--retries', type=int, default=3, help='RateLimiter max retries')
   parser.add_argument('--robots', action='store_true', help='Respect robots.txt during crawling')
   parser.add_argument('--pdfs', action='store_true', help='Include PDF URLs (use PDF scraping strategy)')
+  parser.add_argument('--resume', action='store_true', help='Continue an interrupted crawl, skipping pages and assets recorded in the progress journal')
+  parser.add_argument('--flushInterval', type=float, default=60.0, help='Seconds between periodic saves of the manifest and asset caches')
+  parser.add_argument('--followLinks', action='store_true', help='Also crawl same-origin links found on rendered pages (for thin or missing sitemaps)')
+  parser.add_argument('--maxDepth', type=int, default=2, help='Link depth to follow from sitemap/origin pages with --followLinks')
+  parser.add_argument('--writeQueue', type=int, default=32, help='Max rendered pages waiting to be written before rendering is held back')
+  parser.add_argument('--writeThreads', type=int, default=4, help='Threads writing pages to disk')
+  parser.add_argument('--incremental', action='store_true', help='Skip pages unchanged since the last crawl (sitemap lastmod / ETag / Last-Modified)')
+  parser.add_argument('--searchIndex', action='store_true', help="Update the brand's full-text search index with new/changed pages after crawling")
   args = parser.parse_args()
 
+  # Turn SIGTERM (sent by the admin "stop" button) into a normal exit so state gets flushed
+  signal.signal(signal.SIGTERM, lambda *_: sys.exit(143))
+
   brands = read_brands()
   targets = [b for b in brands if (not args.brand or b['slug'] == args.brand)]
   if not targets:
     raise SystemExit('No matching brands. Use --brand=<slug> or edit brands.json')
 
-  for b in targets:
+  failed = asyncio.run(crawl_targets(targets, args))
+  if failed:
+    raise SystemExit(f"Crawl failed for: {', '.join(failed)}")
+
+
+async def crawl_targets(targets: list[dict], args) -> list[str]:
+  """Crawl brands concurrently in one event loop; returns the slugs that failed.
+
+  --parallelBrands bounds how many brands run at once; --globalConcurrency
+  and --originDelay form the shared CrawlBudget. Each brand keeps its own
+  output directory, asset state and stats.
+  """
+  budget = CrawlBudget(args.globalConcurrency, args.originDelay, shares=min(max(1, args.parallelBrands), len(targets)))
+  brand_sem = asyncio.Semaphore(max(1, args.parallelBrands))
+  failed: list[str] = []
+
+  async def run(b: dict):
     slug = b['slug']
     origin = b['origin']
     out_dir = os.path.join(ROOT, 'output_markdown', slug)
+    async with brand_sem:
+      started = time.monotonic()
+      try:
+        await crawl_one(slug, origin, out_dir)
+        print(f'[{slug}] Finished in {time.monotonic() - started:.1f}s')
+      except Exception as e:
+        failed.append(slug)
+        print(f'[{slug}] FAILED after {time.monotonic() - started:.1f}s -> {e}')
+
+  async def crawl_one(slug: str, origin: str, out_dir: str):
     if args.many:
-      asyncio.run(crawl_brand_many(
+      await crawl_brand_many(
         slug, origin, args.maxPages, out_dir,
         enable_stealth=args.stealth,
         use_undetected=args.undetected,
@@ -808,9 +1757,23 @@ def main():
         max_retries=args.retries,
         check_robots=args.robots,
         include_pdfs=args.pdfs,
-      ))
+        incremental=args.incremental,
+        resume=args.resume,
+        flush_interval=args.flushInterval,
+        budget=budget,
+        write_queue=args.writeQueue,
+        write_threads=args.writeThreads,
+        capture_format=args.captureFormat,
+        search_index=args.searchIndex,
+        shared_assets=args.sharedAssets,
+        compact_cache=args.compactCache,
+        download_assets=args.downloadAssets,
+        asset_concurrency=args.assetConcurrency,
+        asset_per_host=args.assetPerHost,
+        asset_timeout=args.assetTimeout,
+      )
     else:
-      asyncio.run(crawl_brand(
+      await crawl_brand(
         slug, origin, args.maxPages, args.concurrency, out_dir,
         enable_stealth=args.stealth,
         use_undetected=args.undetected,
@@ -822,7 +1785,26 @@ def main():
         capture_network=args.captureNetwork,
         capture_console=args.captureConsole,
         download_assets=args.downloadAssets,
-      ))
+        follow_links=args.followLinks,
+        max_depth=args.maxDepth,
+        browser_pool=args.browserPool,
+        asset_concurrency=args.assetConcurrency,
+        asset_per_host=args.assetPerHost,
+        asset_timeout=args.assetTimeout,
+        incremental=args.incremental,
+        resume=args.resume,
+        flush_interval=args.flushInterval,
+        budget=budget,
+        write_queue=args.writeQueue,
+        write_threads=args.writeThreads,
+        capture_format=args.captureFormat,
+        search_index=args.searchIndex,
+        shared_assets=args.sharedAssets,
+        compact_cache=args.compactCache,
+      )
+
+  await asyncio.gather(*(run(b) for b in targets))
+  return failed
 
 
 if __name__ == '__main__':
@@ -0,0 +1,198 @@
+import argparse
+import glob
+import hashlib
+import os
+import re
+import time
+from typing import Dict, List, Tuple
+
+from capture_store import capture_url
+
+try:
+  import chromadb  # type: ignore
+  from sentence_transformers import SentenceTransformer  # type: ignore
+except Exception as e:
+  raise SystemExit("sentence-transformers/chromadb are not installed. Run: pip install -r requirements.txt") from e
+
+ROOT = os.path.dirname(__file__)
+
+DEFAULT_MODEL = 'sentence-transformers/all-MiniLM-L6-v2'
+HEADING_RE = re.compile(r'^#{1,6}\s', re.MULTILINE)
+# Chroma rejects very large add/upsert batches
+UPSERT_BATCH = 1000
+
+
+def content_hash(text: str) -> str:
+  """Same hash the Node embedder stores (SHA-256 of the trimmed chunk)."""
+  return hashlib.sha256(text.strip().encode('utf-8')).hexdigest()
+
+
+def split_long(section: str, max_chars: int) -> List[str]:
+  """Split an oversized section on paragraph boundaries (hard-cut paragraphs that are still too long)."""
+  pieces: List[str] = []
+  current = ''
+  for para in section.split('\n\n'):
+    while len(para) > max_chars:
+      if current:
+        pieces.append(current)
+        current = ''
+      pieces.append(para[:max_chars])
+      para = para[max_chars:]
+    if current and len(current) + 2 + len(para) > max_chars:
+      pieces.append(current)
+      current = para
+    else:
+      current = f"{current}\n\n{para}" if current else para
+  if current:
+    pieces.append(current)
+  return pieces
+
+
+def chunk_markdown(md: str, max_chars: int = 1500) -> List[str]:
+  """Split a page at its headings; each chunk starts with its heading line."""
+  starts = [m.start() for m in HEADING_RE.finditer(md)]
+  if not starts or starts[0] != 0:
+    starts.insert(0, 0)
+  chunks: List[str] = []
+  for begin, end in zip(starts, starts[1:] + [len(md)]):
+    section = md[begin:end].strip()
+    if not section:
+      continue
+    chunks.extend(p.strip() for p in split_long(section, max_chars) if p.strip())
+  return chunks
+
+
+def collection_name(slug: str) -> str:
+  # Chroma names: 3-63 chars of [a-zA-Z0-9._-], starting and ending alphanumeric
+  return f"pages-{re.sub(r'[^a-zA-Z0-9._-]', '-', slug)}"[:63].rstrip('-_.')
+
+
+class Encoder:
+  """SentenceTransformer on CPU, batched; with workers > 1 it encodes through a multi-process pool."""
+
+  def __init__(self, model_name: str, *, batch_size: int, workers: int):
+    self.model = SentenceTransformer(model_name, device='cpu')
+    self.batch_size = batch_size
+    self.pool = self.model.start_multi_process_pool(['cpu'] * workers) if workers > 1 else None
+
+  def encode(self, texts: List[str]) -> List[List[float]]:
+    if not texts:
+      return []
+    if self.pool is not None:
+      vectors = self.model.encode_multi_process(texts, self.pool, batch_size=self.batch_size, normalize_embeddings=True)
+    else:
+      vectors = self.model.encode(texts, batch_size=self.batch_size, normalize_embeddings=True, convert_to_numpy=True, show_progress_bar=False)
+    return vectors.tolist()
+
+  def close(self):
+    if self.pool is not None:
+      self.model.stop_multi_process_pool(self.pool)
+      self.pool = None
+
+
+def embed_brand(client, encoder: Encoder, slug: str, *, max_chars: int) -> Dict[str, int]:
+  """Upsert a brand's page chunks into its collection, encoding only content it has not embedded yet.
+
+  Chunk ids are '<file>#<index>' with the content hash in the metadata.
+  Unchanged chunks are skipped; changed chunks whose text already exists
+  elsewhere in the collection reuse that vector; chunks of removed pages or
+  beyond a page's new chunk count are deleted.
+  """
+  in_dir = os.path.join(ROOT, 'output_markdown', slug)
+  collection = client.get_or_create_collection(collection_name(slug), metadata={'hnsw:space': 'cosine'})
+  existing = collection.get(include=['metadatas'])
+  stored: Dict[str, str] = {i: (m or {}).get('content_hash', '') for i, m in zip(existing['ids'], existing['metadatas'])}
+  id_by_hash: Dict[str, str] = {h: i for i, h in stored.items() if h}
+
+  wanted: List[Tuple[str, str, str, dict]] = []  # (id, hash, text, metadata) still to upsert
+  keep = set()
+  for md_path in sorted(glob.glob(os.path.join(in_dir, '*.md'))):
+    try:
+      with open(md_path, 'r', encoding='utf-8') as f:
+        md = f.read()
+    except Exception:
+      continue
+    fname = os.path.basename(md_path)
+    url = capture_url(in_dir, fname)
+    for index, chunk in enumerate(chunk_markdown(md, max_chars)):
+      chunk_id = f"{fname}#{index}"
+      h = content_hash(chunk)
+      keep.add(chunk_id)
+      if stored.get(chunk_id) == h:
+        continue
+      wanted.append((chunk_id, h, chunk, {'brand': slug, 'file': fname, 'chunk_index': index, 'url': url, 'content_hash': h}))
+
+  # Vectors by content hash: reuse what the collection already has, encode the rest once each
+  vectors: Dict[str, List[float]] = {}
+  reuse = {h: id_by_hash[h] for _, h, _, _ in wanted if h in id_by_hash}
+  if reuse:
+    got = collection.get(ids=list(dict.fromkeys(reuse.values())), include=['embeddings'])
+    by_id = dict(zip(got['ids'], got['embeddings']))
+    vectors.update({h: list(by_id[i]) for h, i in reuse.items() if i in by_id})
+  to_encode = {h: text for _, h, text, _ in wanted if h not in vectors}
+  hashes = list(to_encode)
+  vectors.update(zip(hashes, encoder.encode([to_encode[h] for h in hashes])))
+
+  for start in range(0, len(wanted), UPSERT_BATCH):
+    batch = wanted[start:start + UPSERT_BATCH]
+    collection.upsert(
+      ids=[w[0] for w in batch],
+      embeddings=[vectors[w[1]] for w in batch],
+      documents=[w[2] for w in batch],
+      metadatas=[w[3] for w in batch],
+    )
+  stale = [i for i in stored if i not in keep]
+  for start in range(0, len(stale), UPSERT_BATCH):
+    collection.delete(ids=stale[start:start + UPSERT_BATCH])
+
+  return {
+    'chunks': len(keep),
+    'unchanged': len(keep) - len(wanted),
+    'reused': len(wanted) - len(to_encode),
+    'encoded': len(to_encode),
+    'deleted': len(stale),
+  }
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Chunk crawled markdown by heading and embed it into a local Chroma collection per brand')
+  parser.add_argument('--brand', help='Single brand slug to embed (default: all under output_markdown)')
+  parser.add_argument('--model', default=DEFAULT_MODEL, help='SentenceTransformer model name')
+  parser.add_argument('--batchSize', type=int, default=128, help='Chunks per encode batch')
+  parser.add_argument('--workers', type=int, default=1, help='Encoder processes (CPU)')
+  parser.add_argument('--maxChars', type=int, default=1500, help='Max characters per chunk (long sections are split by paragraph)')
+  parser.add_argument('--chroma', default=os.path.join(ROOT, 'output_markdown', '_chroma'), help='Chroma persistence directory')
+  parser.add_argument('--query', default=None, help='Instead of embedding, print the closest chunks for this text')
+  parser.add_argument('-k', type=int, default=5, help='Results per brand for --query')
+  args = parser.parse_args()
+
+  base = os.path.join(ROOT, 'output_markdown')
+  if args.brand:
+    slugs = [args.brand]
+  else:
+    slugs = [d for d in os.listdir(base) if os.path.isdir(os.path.join(base, d)) and not d.startswith('_')]
+
+  client = chromadb.PersistentClient(path=args.chroma)
+  encoder = Encoder(args.model, batch_size=args.batchSize, workers=args.workers)
+  try:
+    if args.query:
+      qv = encoder.encode([args.query])
+      for slug in slugs:
+        collection = client.get_or_create_collection(collection_name(slug), metadata={'hnsw:space': 'cosine'})
+        res = collection.query(query_embeddings=qv, n_results=args.k, include=['metadatas', 'distances'])
+        for meta, dist in zip(res['metadatas'][0], res['distances'][0]):
+          print(f"[{slug}] {dist:.3f} {meta.get('url') or meta.get('file')} #{meta.get('chunk_index')}")
+      return
+    for slug in slugs:
+      started = time.monotonic()
+      stats = embed_brand(client, encoder, slug, max_chars=args.maxChars)
+      print(
+        f"[{slug}] {stats['chunks']} chunks: {stats['encoded']} encoded, {stats['reused']} reused, "
+        f"{stats['unchanged']} unchanged, {stats['deleted']} deleted ({time.monotonic() - started:.1f}s)"
+      )
+  finally:
+    encoder.close()
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,101 @@
+"""Single-pass markdown link scanner shared by the crawler and its test scripts.
+
+One scan finds every markdown link / image (`[text](url "title")`,
+`![alt](url)`, including images nested in link text such as
+`[![alt](img.png)](https://x/)`), classifies it by kind, and the same scan
+drives a one-pass rewrite of asset URLs to local paths.
+
+Brackets are paired with a stack in one pass, and each destination is
+matched once, at the position right after its closing bracket, so the cost
+stays linear in the size of the page even on unbalanced input.
+"""
+import re
+
+# Non-image, non-PDF/TXT file types we treat as downloadable assets
+OTHER_LINK_EXTENSIONS = ('.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.zip', '.rar', '.csv', '.xml', '.json')
+
+BRACKET_RE = re.compile(r'[\[\]]')
+# Link destination right after the closing bracket: 1 = url, 2 = optional ' "title"' part (kept verbatim on rewrite)
+DEST_RE = re.compile(r'\(([^\s\)]+)((?:\s[^\)]*)?)\)')
+
+
+def classify_link(url: str, is_image: bool) -> str | None:
+  """Return 'image', 'pdf', 'txt' or 'other' for asset links, None for plain page links"""
+  if is_image:
+    return 'image'
+  lower = url.lower()
+  if lower.endswith('.pdf'):
+    return 'pdf'
+  if lower.endswith('.txt'):
+    return 'txt'
+  if lower.endswith(OTHER_LINK_EXTENSIONS):
+    return 'other'
+  return None
+
+
+def _bracket_pairs(md: str) -> list[tuple[int, int]]:
+  """(open, close) offsets of balanced [ ] pairs, ordered by the opening bracket"""
+  pairs = []
+  stack = []
+  for m in BRACKET_RE.finditer(md):
+    if m.group() == '[':
+      stack.append(m.start())
+    elif stack:
+      pairs.append((stack.pop(), m.start()))
+  pairs.sort()
+  return pairs
+
+
+def find_links(md: str) -> list[tuple[bool, str, int, int]]:
+  """(is_image, url, url_start, url_end) of every link and image, in document order"""
+  links = []
+  last_paren = md.rfind(')')
+  # Destinations of links already found; a '[' inside one is part of a URL or title, not a link.
+  # The top of the stack is always the leftmost of them.
+  dests: list[tuple[int, int]] = []
+  for start, close in _bracket_pairs(md):
+    if close >= last_paren:
+      # No ')' after it to end a destination
+      continue
+    while dests and dests[-1][1] <= start:
+      dests.pop()
+    if dests and dests[-1][0] <= start:
+      continue
+    m = DEST_RE.match(md, close + 1)
+    if not m:
+      continue
+    dests.append((m.start(), m.end()))
+    links.append((start > 0 and md[start - 1] == '!', m.group(1), m.start(1), m.end(1)))
+  # Pairs come outer link first; order by URL position so nested images precede their link
+  links.sort(key=lambda link: link[2])
+  return links
+
+
+def extract_asset_links(md: str) -> dict[str, list[str]]:
+  """Scan markdown once and return asset URLs by kind, in document order.
+
+  Keys: 'image', 'pdf', 'txt', 'other', plus 'all' with every asset URL.
+  """
+  found: dict[str, list[str]] = {'image': [], 'pdf': [], 'txt': [], 'other': [], 'all': []}
+  for is_image, url, _, _ in find_links(md):
+    kind = classify_link(url, is_image)
+    if kind:
+      found[kind].append(url)
+      found['all'].append(url)
+  return found
+
+
+def rewrite_links(md: str, local_paths: dict[str, str]) -> str:
+  """Replace link URLs found in local_paths with their local path in one linear pass"""
+  if not local_paths:
+    return md
+  out = []
+  pos = 0
+  for _, url, url_start, url_end in find_links(md):
+    local = local_paths.get(url)
+    if local:
+      out.append(md[pos:url_start])
+      out.append(local)
+      pos = url_end
+  out.append(md[pos:])
+  return ''.join(out)
@@ -0,0 +1,78 @@
+"""URL canonicalisation for the runner: asset dedup keys, the crawl frontier, page file names and origin checks.
+
+normalize_url lowercases the scheme and host, drops cache-busting and
+tracking query parameters and sorts the remaining ones by key (repeated keys
+keep their order). Parameters are kept exactly as written: nothing is decoded
+and encoded again. Results are memoised in bounded LRU caches, since the same
+asset and link URLs recur on every page of a site.
+"""
+from functools import lru_cache
+from typing import Tuple
+from urllib.parse import urldefrag, urlsplit, urlunsplit
+
+# Query parameters that only defeat caches: the resource is the same whatever their value
+CACHE_BUSTERS = frozenset({
+  'v', 'version', 'timestamp', 'ts', 't', 'cache', 'cb', 'cachebuster',
+  '_', 'rand', 'random', 'time', 'nocache', 'bust', 'rev', 'r',
+})
+# Click/campaign tracking parameters (plus every utm_*)
+TRACKING_PARAMS = frozenset({'fbclid', 'gclid'})
+
+CACHE_SIZE = 65536
+
+
+def _keep_param(pair: str) -> bool:
+  key = pair.split('=', 1)[0].lower()
+  return bool(pair) and key not in CACHE_BUSTERS and key not in TRACKING_PARAMS and not key.startswith('utm_')
+
+
+def _param_key(pair: str) -> str:
+  return pair.split('=', 1)[0]
+
+
+def _lower_host(netloc: str) -> str:
+  """Lowercase the host part of a netloc (user info is case-sensitive)"""
+  if '@' in netloc:
+    userinfo, host = netloc.rsplit('@', 1)
+    return f"{userinfo}@{host.lower()}"
+  return netloc.lower()
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def normalize_url(url: str) -> str:
+  """Canonical form of a URL for deduplication (the URL itself if it cannot be parsed)"""
+  try:
+    parts = urlsplit(url)
+  except ValueError:
+    return url
+  query = parts.query
+  if query:
+    query = '&'.join(sorted(filter(_keep_param, query.split('&')), key=_param_key))
+  return urlunsplit((parts.scheme, _lower_host(parts.netloc), parts.path, query, parts.fragment))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def normalize_page_url(url: str) -> str:
+  """Dedup key for page URLs: normalize_url without the fragment"""
+  return normalize_url(urldefrag(url)[0])
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def url_origin(url: str) -> Tuple[str, str]:
+  """(scheme, lowercased netloc) of a URL; empty strings if it cannot be parsed"""
+  try:
+    parts = urlsplit(url)
+  except ValueError:
+    return '', ''
+  return parts.scheme, _lower_host(parts.netloc)
+
+
+def same_origin(u: str, origin: str) -> bool:
+  """True for http(s) URLs on the same host as origin (scheme may differ, host case does not matter)"""
+  scheme, host = url_origin(u)
+  return scheme in ('http', 'https') and host == url_origin(origin)[1]
+
+
+def cache_info() -> dict:
+  """Hit/miss counts of the memo caches (for benchmarks and debugging)"""
+  return {f.__name__: f.cache_info()._asdict() for f in (normalize_url, normalize_page_url, url_origin)}
@@ -0,0 +1,334 @@
+"""Compact sets and maps of normalised URLs for large crawls.
+
+Each URL is reduced to a 64-bit BLAKE2b key: eight bytes instead of a Python
+string, with about a 3e-8 chance of any collision among a million URLs. Keys
+loaded from disk sit in a sorted array('Q') probed with bisect. Keys added
+since then live in a small set/dict and are merged in on save. An optional
+Bloom filter in front of the sorted array answers most misses without the
+probe.
+
+Files are a fixed header followed by raw arrays, so loading is a handful of
+memory copies rather than a JSON parse:
+
+  magic(8) count(Q) table_bytes(Q) bloom_bits(Q) bloom_hashes(I)
+  keys[count](Q) [values[count](I)] bloom[bloom_bits / 8] [table(utf-8, '\\n'-joined)]
+
+UrlMap stores each distinct value (an asset path) once in that table.
+"""
+import array
+import hashlib
+import heapq
+import math
+import os
+import struct
+import sys
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+HEADER = struct.Struct('<8sQQQI')
+SET_MAGIC = b'URLSET1\0'
+MAP_MAGIC = b'URLMAP1\0'
+# Value id of an entry popped from the loaded (sorted) part of a UrlMap
+DELETED = 0xFFFFFFFF
+BLOOM_ERROR_RATE = 0.01
+# New keys a save inserts into the sorted arrays in place; more than this and they are merged in one pass
+INSERT_LIMIT = 1024
+
+
+def url_key(url: str) -> int:
+  return int.from_bytes(hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def _to_disk(arr: array.array) -> bytes:
+  if sys.byteorder == 'little':
+    return arr.tobytes()
+  arr = array.array(arr.typecode, arr)
+  arr.byteswap()
+  return arr.tobytes()
+
+
+def _from_disk(typecode: str, data: bytes) -> array.array:
+  arr = array.array(typecode)
+  arr.frombytes(data)
+  if sys.byteorder != 'little':
+    arr.byteswap()
+  return arr
+
+
+class BloomFilter:
+  """Bloom filter over 64-bit URL keys (positions by double hashing the key halves)"""
+
+  def __init__(self, bits: int, hashes: int, data: Optional[bytes] = None):
+    self.bits = max(8, bits)
+    self.hashes = max(1, hashes)
+    self.data = bytearray(data) if data is not None else bytearray((self.bits + 7) // 8)
+
+  @classmethod
+  def for_capacity(cls, capacity: int) -> 'BloomFilter':
+    capacity = max(1, capacity)
+    bits = int(-capacity * math.log(BLOOM_ERROR_RATE) / (math.log(2) ** 2))
+    return cls(bits, round(bits / capacity * math.log(2)))
+
+  @property
+  def capacity(self) -> int:
+    """Keys the filter holds at BLOOM_ERROR_RATE"""
+    return int(self.bits * math.log(2) ** 2 / -math.log(BLOOM_ERROR_RATE))
+
+  def add(self, key: int):
+    h1, h2, m, data = key & 0xFFFFFFFF, (key >> 32) | 1, self.bits, self.data
+    for i in range(self.hashes):
+      p = (h1 + i * h2) % m
+      data[p >> 3] |= 1 << (p & 7)
+
+  def __contains__(self, key: int) -> bool:
+    h1, h2, m, data = key & 0xFFFFFFFF, (key >> 32) | 1, self.bits, self.data
+    for i in range(self.hashes):
+      p = (h1 + i * h2) % m
+      if not data[p >> 3] >> (p & 7) & 1:
+        return False
+    return True
+
+
+class _KeyIndex:
+  """Sorted keys loaded from disk, with an optional Bloom filter in front"""
+
+  def __init__(self, bloom: bool = False):
+    self.use_bloom = bloom
+    self._keys = array.array('Q')
+    self._bloom: Optional[BloomFilter] = None
+
+  def _find(self, key: int) -> int:
+    """Index of key in the sorted keys, or -1"""
+    if self._bloom is not None and key not in self._bloom:
+      return -1
+    keys = self._keys
+    i = bisect_left(keys, key)
+    return i if i < len(keys) and keys[i] == key else -1
+
+  def _set_keys(self, keys: array.array, added: Optional[Iterable[int]] = None):
+    """Install new sorted keys; the Bloom filter takes just `added` while it has room, else it is rebuilt"""
+    self._keys = keys
+    if not self.use_bloom or not keys:
+      self._bloom = None
+      return
+    bloom = self._bloom
+    if bloom is None or added is None or bloom.capacity < len(keys):
+      # Room to grow, so later saves only add their new keys
+      bloom = BloomFilter.for_capacity(2 * len(keys))
+      added = keys
+    for key in added:
+      bloom.add(key)
+    self._bloom = bloom
+
+  def _write(self, path, magic: bytes, values: Optional[array.array] = None, table: bytes = b''):
+    bloom = self._bloom
+    header = HEADER.pack(magic, len(self._keys), len(table), bloom.bits if bloom else 0, bloom.hashes if bloom else 0)
+    tmp = f"{path}.tmp"
+    with open(tmp, 'wb') as f:
+      f.write(header)
+      f.write(_to_disk(self._keys))
+      if values is not None:
+        f.write(_to_disk(values))
+      if bloom:
+        f.write(bloom.data)
+      f.write(table)
+    os.replace(tmp, path)
+
+  def _read(self, path, magic: bytes, with_values: bool):
+    """Load keys and bloom from path; returns (values array or None, table bytes)"""
+    with open(path, 'rb') as f:
+      data = f.read()
+    found, count, table_len, bloom_bits, bloom_hashes = HEADER.unpack_from(data)
+    if found != magic:
+      raise ValueError(f"{path}: not a {magic[:6].decode()} file")
+    pos = HEADER.size
+    self._keys = _from_disk('Q', data[pos:pos + 8 * count])
+    pos += 8 * count
+    values = None
+    if with_values:
+      values = _from_disk('I', data[pos:pos + 4 * count])
+      pos += 4 * count
+    self._bloom = None
+    if bloom_bits:
+      size = (bloom_bits + 7) // 8
+      if self.use_bloom:
+        self._bloom = BloomFilter(bloom_bits, bloom_hashes, data[pos:pos + size])
+      pos += size
+    elif self.use_bloom and count:
+      self._set_keys(self._keys)
+    return values, data[pos:pos + table_len]
+
+
+class UrlSet(_KeyIndex):
+  """Seen-set of URLs (page frontier dedup)"""
+
+  def __init__(self, urls: Iterable[str] = (), *, bloom: bool = False):
+    super().__init__(bloom)
+    self._added = set()
+    self.update(urls)
+
+  def __contains__(self, url: str) -> bool:
+    key = url_key(url)
+    return key in self._added or self._find(key) >= 0
+
+  def add(self, url: str) -> bool:
+    """Add url; False if it was already present"""
+    key = url_key(url)
+    if key in self._added or self._find(key) >= 0:
+      return False
+    self._added.add(key)
+    return True
+
+  def update(self, urls: Iterable[str]):
+    for url in urls:
+      self.add(url)
+
+  def __len__(self) -> int:
+    return len(self._keys) + len(self._added)
+
+  def save(self, path):
+    if not self._added and os.path.exists(path):
+      return
+    if self._added:
+      added = sorted(self._added)
+      self._set_keys(array.array('Q', heapq.merge(self._keys, added)), added)
+      self._added = set()
+    self._write(path, SET_MAGIC)
+
+  @classmethod
+  def load(cls, path, *, bloom: bool = False) -> 'UrlSet':
+    seen = cls(bloom=bloom)
+    seen._read(path, SET_MAGIC, with_values=False)
+    return seen
+
+
+class UrlMap(_KeyIndex):
+  """URL -> string map (normalised asset URL -> relative path) with each distinct value stored once.
+
+  Supports the dict operations the asset cache uses: `in`, `[]`, get, `[]=`,
+  pop, update and len.
+  """
+
+  def __init__(self, items: Optional[Dict[str, str]] = None, *, bloom: bool = False):
+    super().__init__(bloom)
+    self._values = array.array('I')
+    self._table: List[str] = []
+    self._added: Dict[int, Optional[str]] = {}
+    self._dirty = False
+    if items:
+      self.update(items)
+
+  def _get_key(self, key: int):
+    if key in self._added:
+      return self._added[key]
+    i = self._find(key)
+    if i < 0 or self._values[i] == DELETED:
+      raise KeyError(key)
+    return self._table[self._values[i]]
+
+  def __contains__(self, url: str) -> bool:
+    try:
+      self._get_key(url_key(url))
+      return True
+    except KeyError:
+      return False
+
+  def __getitem__(self, url: str) -> Optional[str]:
+    try:
+      return self._get_key(url_key(url))
+    except KeyError:
+      raise KeyError(url) from None
+
+  def get(self, url: str, default=None):
+    try:
+      return self._get_key(url_key(url))
+    except KeyError:
+      return default
+
+  def __setitem__(self, url: str, value: Optional[str]):
+    self._added[url_key(url)] = value
+    self._dirty = True
+
+  def update(self, items: Dict[str, Optional[str]]):
+    self._added.update((url_key(u), v) for u, v in items.items())
+    self._dirty = True
+
+  def pop(self, url: str, default=None):
+    key = url_key(url)
+    try:
+      value = self._get_key(key)
+    except KeyError:
+      return default
+    self._added.pop(key, None)
+    i = self._find(key)
+    if i >= 0:
+      self._values[i] = DELETED
+    self._dirty = True
+    return value
+
+  def __len__(self) -> int:
+    live = len(self._keys) - self._values.count(DELETED)
+    for key in self._added:
+      i = self._find(key)
+      if i < 0 or self._values[i] == DELETED:
+        live += 1
+    return live
+
+  def remap_values(self, mapping: Dict[str, str]) -> int:
+    """Replace values through mapping (e.g. removed duplicate -> kept file); returns entries changed"""
+    changed_ids = {i for i, v in enumerate(self._table) if v in mapping}
+    counts = Counter(self._values)
+    changed = sum(counts[i] for i in changed_ids)
+    for i in changed_ids:
+      self._table[i] = mapping[self._table[i]]
+    for key, value in self._added.items():
+      if value in mapping:
+        self._added[key] = mapping[value]
+        changed += 1
+    self._dirty = self._dirty or changed > 0
+    return changed
+
+  def save(self, path):
+    if not self._dirty and os.path.exists(path):
+      return
+    table = self._table
+    ids = {v: i for i, v in enumerate(table)}
+
+    def value_id(value):
+      if value not in ids:
+        ids[value] = len(table)
+        table.append(value)
+      return ids[value]
+
+    keys, values = self._keys, self._values
+    new = []
+    for key, value in self._added.items():
+      i = self._find(key)
+      if i >= 0:
+        values[i] = value_id(value)
+      else:
+        new.append((key, value_id(value)))
+    new.sort()
+    if len(new) > INSERT_LIMIT or DELETED in values:
+      pairs = heapq.merge(((k, v) for k, v in zip(keys, values) if v != DELETED), new)
+      keys, values = array.array('Q'), array.array('I')
+      for k, v in pairs:
+        keys.append(k)
+        values.append(v)
+    else:
+      for key, vid in new:
+        i = bisect_left(keys, key)
+        keys.insert(i, key)
+        values.insert(i, vid)
+    self._set_keys(keys, [k for k, _ in new])
+    self._values, self._added, self._dirty = values, {}, False
+    # None (an asset that failed) is stored as an empty string
+    self._write(path, MAP_MAGIC, values, '\n'.join(v or '' for v in table).encode('utf-8'))
+
+  @classmethod
+  def load(cls, path, *, bloom: bool = False) -> 'UrlMap':
+    urls = cls(bloom=bloom)
+    urls._values, table = urls._read(path, MAP_MAGIC, with_values=True)
+    urls._table = [v or None for v in table.decode('utf-8').split('\n')] if len(urls._values) else []
+    return urls
@@ -1,10 +1,18 @@
 import os
+import sys
 import json
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import List, Tuple, Optional
+from typing import Any, Callable, Dict, List, Tuple, Optional
 
 ROOT = Path(__file__).resolve().parents[1]
 
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+from capture_store import read_capture  # noqa: E402
+from viewer_app.search_index import search  # noqa: E402
+
 
 def get_crawl_root() -> Path:
     env = os.getenv('CRAWL_MD_ROOT')
@@ -14,18 +22,181 @@ def get_crawl_root() -> Path:
     return (ROOT / 'output_markdown').resolve()
 
 
+class FileCache:
+    """Bounded LRU of loaded files, keyed by (path, kind) and valid while the file's (mtime, size) match.
+
+    A crawl or aggregation that rewrites a file changes its mtime/size, so the
+    next read reloads it; nothing has to be invalidated by hand. Entries are
+    evicted least-recently-used once `max_entries` or `max_bytes` (summed file
+    sizes) is exceeded. Cached values are shared between callers: treat them
+    as read-only.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[Tuple[str, str], Tuple[Tuple[int, int], int, Any]]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, path: Path, kind: str, loader: Callable[[Path], Any]) -> Any:
+        """Cached loader(path); raises OSError if the path does not exist."""
+        st = path.stat()
+        sig = (st.st_mtime_ns, st.st_size)
+        key = (str(path), kind)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == sig:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+        value = loader(path)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            if st.st_size <= self.max_bytes:
+                self._entries[key] = (sig, st.st_size, value)
+                self._bytes += st.st_size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, size, _) = self._entries.popitem(last=False)
+                self._bytes -= size
+                self.evictions += 1
+        return value
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+_cache = FileCache(
+    max_entries=int(os.getenv('VIEWER_CACHE_ENTRIES') or 256),
+    max_bytes=int(os.getenv('VIEWER_CACHE_MB') or 256) * 1024 * 1024,
+)
+
+
+def cache_stats() -> dict:
+    """Hit/miss/eviction counters and current size of the reader cache, for monitoring."""
+    return _cache.stats()
+
+
+def clear_cache():
+    _cache.clear()
+
+
+def _read_text(path: Path) -> str:
+    return path.read_text(encoding='utf-8')
+
+
+def _read_json(path: Path) -> Any:
+    return json.loads(path.read_text(encoding='utf-8'))
+
+
+def _list_dirs(path: Path) -> List[str]:
+    # A directory's mtime changes whenever entries are added, removed or renamed
+    return sorted(p.name for p in path.iterdir() if p.is_dir() and not p.name.startswith('_'))
+
+
 def list_brands() -> List[str]:
     root = get_crawl_root()
-    if not root.exists():
+    try:
+        return list(_cache.get(root, 'dirs', _list_dirs))
+    except OSError:
         return []
-    return [p.name for p in root.iterdir() if p.is_dir() and not p.name.startswith('_')]
+
+
+# Written atomically by crawl4ai_runner.py: {'version': 1, 'pages': {url: record}}
+CRAWL_MANIFEST = '.crawl_manifest.json'
+
+
+def _read_manifest(path: Path) -> dict:
+    """Manifest pages plus the file/URL lookup maps, built once per manifest version."""
+    pages = _read_json(path).get('pages', {}) or {}
+    by_file: Dict[str, Tuple[str, dict]] = {}
+    by_url: Dict[str, str] = {}
+    for url, rec in pages.items():
+        fname = rec.get('file')
+        if not fname:
+            continue
+        by_file.setdefault(fname, (rec.get('url') or url, rec))
+        by_url[url] = fname
+    # Final (post-redirect) URLs too, without shadowing a requested URL
+    for url, rec in pages.items():
+        if rec.get('file') and rec.get('url'):
+            by_url.setdefault(rec['url'], rec['file'])
+    return {'pages': pages, 'by_file': by_file, 'by_url': by_url}
+
+
+def _manifest(brand: str) -> dict:
+    path = get_crawl_root() / brand / CRAWL_MANIFEST
+    try:
+        return _cache.get(path, 'manifest', _read_manifest)
+    except Exception:
+        return {'pages': {}, 'by_file': {}, 'by_url': {}}
+
+
+def load_page_manifest(brand: str) -> Dict[str, dict]:
+    """Page records of a brand's crawl manifest, keyed by requested URL ({} if never crawled)."""
+    return _manifest(brand)['pages']
+
+
+def list_brand_pages(brand: str) -> List[dict]:
+    """Manifest records (url, file, size, sha256, fetched_at, assets, ...) sorted by file name."""
+    pages = load_page_manifest(brand)
+    records = [dict(rec, url=rec.get('url') or url) for url, rec in pages.items()]
+    return sorted(records, key=lambda r: r.get('file', ''))
+
+
+def _list_markdown(path: Path) -> List[str]:
+    with os.scandir(path) as it:
+        return sorted(e.name for e in it if e.name.endswith('.md') and e.is_file())
 
 
 def list_brand_files(brand: str) -> List[str]:
-    dir_path = get_crawl_root() / brand
-    if not dir_path.exists():
+    """Markdown files of a brand, from the directory listing (cached until the directory changes).
+
+    The manifest may not cover every page on disk (trees crawled before it
+    existed, failed renders, an interrupted first crawl), so it is used for
+    URLs and records, not for deciding which pages exist.
+    """
+    try:
+        return list(_cache.get(get_crawl_root() / brand, 'markdown', _list_markdown))
+    except OSError:
         return []
-    return sorted([p.name for p in dir_path.iterdir() if p.is_file() and p.suffix == '.md'])
+
+
+def count_brand_pages(brand: str) -> int:
+    return len(list_brand_files(brand))
+
+
+def page_url(brand: str, fname: str) -> Optional[str]:
+    """URL a markdown file was crawled from, looked up in the manifest."""
+    entry = _manifest(brand)['by_file'].get(fname)
+    return entry[0] if entry else None
+
+
+def page_file(brand: str, url: str) -> Optional[str]:
+    """Markdown file name for a crawled URL (requested or final), looked up in the manifest."""
+    return _manifest(brand)['by_url'].get(url)
 
 
 def read_brand_file(brand: str, fname: str) -> Tuple[str, Optional[dict]]:
@@ -35,14 +206,17 @@ def read_brand_file(brand: str, fname: str) -> Tuple[str, Optional[dict]]:
     markdown = ''
     capture = None
     try:
-        markdown = md_path.read_text(encoding='utf-8')
+        markdown = _cache.get(md_path, 'text', _read_text)
     except Exception:
         markdown = ''
     try:
         if cap_path.exists():
-            capture = json.loads(cap_path.read_text(encoding='utf-8'))
+            capture = _cache.get(cap_path, 'json', _read_json)
     except Exception:
         capture = None
+    if capture is None:
+        # Pages written with --captureFormat=stream (or migrated) live in the brand's capture stream
+        capture = read_capture(str(dir_path), fname)
     return markdown, capture
 
 
@@ -56,7 +230,13 @@ def read_aggregated(brand: str) -> str:
     if not p:
         return ''
     try:
-        return p.read_text(encoding='utf-8')
+        return _cache.get(p, 'text', _read_text)
     except Exception:
         return ''
 
+
+def search_pages(query: str, brand: Optional[str] = None, k: int = 10) -> List[dict]:
+    """BM25 keyword search ("quoted phrases" supported) over the brands' search indexes."""
+    root = get_crawl_root()
+    brands = [brand] if brand else list_brands()
+    return search({b: root / b for b in brands}, query, k=k)
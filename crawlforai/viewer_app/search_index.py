@@ -0,0 +1,352 @@
+"""Keyword search over crawled markdown: per-brand positional inverted index with BM25 ranking.
+
+Each brand keeps its index next to its pages in `<brand>/.search_index.json.gz`:
+
+    {"version": 1,
+     "docs": [{"file", "url", "mtime", "size", "length"}, ...],
+     "postings": {term: [[doc_id, [position deltas]], ...]}}
+
+`update_search_index` is incremental: pages whose (mtime, size) did not change
+are not re-read, deleted pages are dropped. Queries load each brand's index
+once (cached until the file changes) and never scan the markdown; only the
+top hits are read back to build snippets.
+
+Query syntax: plain words are OR-ed and BM25-ranked; "quoted phrases" must
+appear verbatim (positional match) in every hit.
+
+    python viewer_app/search_index.py build [--brand=<slug>]
+    python viewer_app/search_index.py query "sectional door" [--brand=<slug>] [-k 10]
+"""
+import argparse
+import gzip
+import heapq
+import json
+import math
+import os
+import re
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+INDEX_NAME = '.search_index.json.gz'
+MANIFEST_NAME = '.crawl_manifest.json'
+
+TOKEN_RE = re.compile(r'[^\W_]+')
+# Link/image targets are URLs, not page text
+LINK_TARGET_RE = re.compile(r'\]\([^)]*\)')
+PHRASE_RE = re.compile(r'"([^"]+)"')
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def index_text(markdown: str) -> str:
+    """The text that gets indexed (and snippeted): markdown minus link targets."""
+    return LINK_TARGET_RE.sub(']', markdown)
+
+
+def tokenize(text: str) -> List[str]:
+    return [m.group(0).lower() for m in TOKEN_RE.finditer(text)]
+
+
+def encode_postings(plist: Dict[int, List[int]], remap: Dict[int, int]) -> str:
+    """'doc:p,d,d;doc:p,d' with live doc ids remapped and positions delta-encoded."""
+    parts = []
+    for doc_id in sorted((d for d in plist if d in remap), key=remap.__getitem__):
+        positions = plist[doc_id]
+        deltas = [positions[0]] + [b - a for a, b in zip(positions, positions[1:])]
+        parts.append(f"{remap[doc_id]}:{','.join(map(str, deltas))}")
+    return ';'.join(parts)
+
+
+def decode_postings(encoded: str) -> Dict[int, List[int]]:
+    plist: Dict[int, List[int]] = {}
+    for part in encoded.split(';'):
+        doc, _, deltas = part.partition(':')
+        pos, positions = 0, []
+        for d in deltas.split(','):
+            pos += int(d)
+            positions.append(pos)
+        plist[int(doc)] = positions
+    return plist
+
+
+class BrandIndex:
+    """In-memory form of one brand's index.
+
+    Posting lists stay in their encoded string form until a query (or a save)
+    needs them, so loading an index is one JSON parse of short strings.
+    Removed docs are only marked dead (docs[id] = None); readers skip them
+    and save drops them for good, compacting the ids.
+    """
+
+    def __init__(self):
+        self.docs: List[Optional[dict]] = []
+        self.file_ids: Dict[str, int] = {}
+        self.postings: Dict[str, object] = {}
+        self.total_length = 0
+
+    @property
+    def doc_count(self) -> int:
+        return len(self.file_ids)
+
+    @classmethod
+    def load(cls, path: Path) -> 'BrandIndex':
+        index = cls()
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                data = json.loads(f.read())
+        except (OSError, ValueError, EOFError):
+            return index
+        index.docs = data.get('docs', [])
+        for doc_id, doc in enumerate(index.docs):
+            index.file_ids[doc['file']] = doc_id
+            index.total_length += doc.get('length', 0)
+        index.postings = data.get('postings', {})
+        return index
+
+    def plist(self, term: str) -> Dict[int, List[int]]:
+        """doc id -> positions for a term ({} if absent), decoded on first use."""
+        plist = self.postings.get(term)
+        if plist is None:
+            return {}
+        if isinstance(plist, str):
+            plist = {d: p for d, p in decode_postings(plist).items() if self.docs[d] is not None}
+            self.postings[term] = plist
+        return plist
+
+    def save(self, path: Path):
+        """Write atomically with live docs renumbered 0..n-1."""
+        remap: Dict[int, int] = {}
+        docs = []
+        for doc_id, doc in enumerate(self.docs):
+            if doc is not None:
+                remap[doc_id] = len(docs)
+                docs.append(doc)
+        postings = {}
+        for term in list(self.postings):
+            encoded = encode_postings(self.plist(term), remap)
+            if encoded:
+                postings[term] = encoded
+        tmp = path.with_name(path.name + '.tmp')
+        with gzip.open(tmp, 'wt', encoding='utf-8', compresslevel=6) as f:
+            f.write(json.dumps({'version': 1, 'docs': docs, 'postings': postings}, separators=(',', ':')))
+        os.replace(tmp, path)
+
+    def remove(self, files: Iterable[str]):
+        for f in files:
+            doc_id = self.file_ids.pop(f, None)
+            if doc_id is None:
+                continue
+            self.total_length -= self.docs[doc_id].get('length', 0)
+            self.docs[doc_id] = None
+
+    def add(self, fname: str, markdown: str, *, url: str, mtime: int, size: int):
+        self.remove([fname])
+        tokens = tokenize(index_text(markdown))
+        doc_id = len(self.docs)
+        self.docs.append({'file': fname, 'url': url, 'mtime': mtime, 'size': size, 'length': len(tokens)})
+        self.file_ids[fname] = doc_id
+        self.total_length += len(tokens)
+        positions: Dict[str, List[int]] = {}
+        for pos, term in enumerate(tokens):
+            positions.setdefault(term, []).append(pos)
+        for term, term_positions in positions.items():
+            plist = self.plist(term)
+            if term not in self.postings:
+                self.postings[term] = plist
+            plist[doc_id] = term_positions
+
+
+def page_urls(brand_dir: Path) -> Dict[str, str]:
+    """file -> URL from the runner's crawl manifest."""
+    try:
+        pages = json.loads((brand_dir / MANIFEST_NAME).read_text(encoding='utf-8')).get('pages', {})
+    except (OSError, ValueError):
+        return {}
+    return {rec['file']: rec.get('url') or url for url, rec in pages.items() if rec.get('file')}
+
+
+def update_search_index(brand_dir, *, verbose: bool = False) -> Tuple[int, int]:
+    """Bring a brand's index in line with its *.md files; returns (pages indexed, pages removed)."""
+    brand_dir = Path(brand_dir)
+    path = brand_dir / INDEX_NAME
+    index = BrandIndex.load(path)
+    seen = set()
+    todo = []
+    for md_path in brand_dir.glob('*.md'):
+        st = md_path.stat()
+        seen.add(md_path.name)
+        doc_id = index.file_ids.get(md_path.name)
+        doc = index.docs[doc_id] if doc_id is not None else None
+        if not (doc and doc['mtime'] == st.st_mtime_ns and doc['size'] == st.st_size):
+            todo.append((md_path, st))
+    stale = [f for f in index.file_ids if f not in seen]
+    index.remove(stale + [p.name for p, _ in todo])
+    urls = page_urls(brand_dir) if todo else {}
+    changed = 0
+    for md_path, st in todo:
+        try:
+            markdown = md_path.read_text(encoding='utf-8')
+        except (OSError, UnicodeDecodeError):
+            continue
+        index.add(md_path.name, markdown, url=urls.get(md_path.name, ''), mtime=st.st_mtime_ns, size=st.st_size)
+        changed += 1
+    if changed or stale or not path.exists():
+        index.save(path)
+    if verbose:
+        print(f"[{brand_dir.name}] Search index: {changed} pages indexed, {len(stale)} removed, {index.doc_count} total")
+    return changed, len(stale)
+
+
+_loaded: Dict[str, Tuple[Tuple[int, int], BrandIndex]] = {}
+
+
+def load_search_index(brand_dir) -> BrandIndex:
+    """A brand's index, kept in memory until its file changes."""
+    path = Path(brand_dir) / INDEX_NAME
+    try:
+        st = path.stat()
+    except OSError:
+        return BrandIndex()
+    key = str(path)
+    cached = _loaded.get(key)
+    if cached and cached[0] == (st.st_mtime_ns, st.st_size):
+        return cached[1]
+    index = BrandIndex.load(path)
+    _loaded[key] = ((st.st_mtime_ns, st.st_size), index)
+    return index
+
+
+def parse_query(query: str) -> Tuple[List[str], List[List[str]]]:
+    """Return (all terms to score, phrases that must match)."""
+    phrases = [tokenize(p) for p in PHRASE_RE.findall(query)]
+    phrases = [p for p in phrases if p]
+    terms = list(dict.fromkeys(tokenize(query)))
+    return terms, phrases
+
+
+def phrase_docs(index: BrandIndex, phrase: List[str]) -> Dict[int, int]:
+    """doc id -> token position of the first occurrence of the phrase (consecutive terms)."""
+    plists = [index.plist(t) for t in phrase]
+    if not all(plists):
+        return {}
+    candidates = set.intersection(*(set(p) for p in plists))
+    matched = {}
+    for doc_id in candidates:
+        later = [set(p[doc_id]) for p in plists[1:]]
+        for start in plists[0][doc_id]:
+            if all(start + i + 1 in s for i, s in enumerate(later)):
+                matched[doc_id] = start
+                break
+    return matched
+
+
+def make_snippet(markdown: str, token_pos: int, width: int = 160) -> str:
+    """~width chars of page text around the token at `token_pos`."""
+    text = index_text(markdown)
+    start = 0
+    for i, m in enumerate(TOKEN_RE.finditer(text)):
+        if i == token_pos:
+            start = m.start()
+            break
+    lo = max(0, start - width // 3)
+    hi = min(len(text), lo + width)
+    snippet = ' '.join(text[lo:hi].split())
+    return ('…' if lo > 0 else '') + snippet + ('…' if hi < len(text) else '')
+
+
+def search(brand_dirs: Dict[str, Path], query: str, *, k: int = 10, snippets: bool = True) -> List[dict]:
+    """BM25 search across brands; returns [{brand, file, url, score, snippet}] best first.
+
+    Collection statistics (N, average length, document frequencies) are summed
+    over the searched brands so scores are comparable between them.
+    """
+    terms, phrases = parse_query(query)
+    if not terms:
+        return []
+    indexes = {brand: load_search_index(d) for brand, d in brand_dirs.items()}
+    n_docs = sum(ix.doc_count for ix in indexes.values())
+    if not n_docs:
+        return []
+    avgdl = sum(ix.total_length for ix in indexes.values()) / n_docs or 1.0
+    df = {t: sum(len(ix.plist(t)) for ix in indexes.values()) for t in terms}
+    idf = {t: math.log(1 + (n_docs - df[t] + 0.5) / (df[t] + 0.5)) for t in terms if df[t]}
+
+    scored = []
+    phrase_starts: Dict[str, Dict[int, int]] = {}
+    for brand, ix in indexes.items():
+        allowed = None
+        for phrase in phrases:
+            docs = phrase_docs(ix, phrase)
+            allowed = docs if allowed is None else {d: allowed[d] for d in docs if d in allowed}
+        scores: Dict[int, float] = {}
+        for t, w in idf.items():
+            for doc_id, positions in ix.plist(t).items():
+                if (allowed is not None and doc_id not in allowed) or ix.docs[doc_id] is None:
+                    continue
+                tf = len(positions)
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * ix.docs[doc_id]['length'] / avgdl)
+                scores[doc_id] = scores.get(doc_id, 0.0) + w * tf * (BM25_K1 + 1) / (tf + norm)
+        scored.extend((score, brand, doc_id) for doc_id, score in scores.items())
+        phrase_starts[brand] = allowed or {}
+
+    hits = []
+    for score, brand, doc_id in heapq.nlargest(k, scored):
+        ix = indexes[brand]
+        doc = ix.docs[doc_id]
+        hit = {'brand': brand, 'file': doc['file'], 'url': doc.get('url', ''), 'score': round(score, 4)}
+        if snippets:
+            # Anchor on the first phrase match, else the earliest query term
+            anchor = phrase_starts[brand].get(doc_id)
+            if anchor is None:
+                anchor = min(ix.plist(t)[doc_id][0] for t in idf if doc_id in ix.plist(t))
+            try:
+                hit['snippet'] = make_snippet((Path(brand_dirs[brand]) / doc['file']).read_text(encoding='utf-8'), anchor)
+            except OSError:
+                hit['snippet'] = ''
+        hits.append(hit)
+    return hits
+
+
+def default_root() -> Path:
+    env = os.getenv('CRAWL_MD_ROOT')
+    if env and env.strip():
+        return Path(env).resolve()
+    return (Path(__file__).resolve().parents[1] / 'output_markdown').resolve()
+
+
+def brand_dirs_under(root: Path, brand: Optional[str] = None) -> Dict[str, Path]:
+    if brand:
+        return {brand: root / brand}
+    if not root.exists():
+        return {}
+    return {p.name: p for p in sorted(root.iterdir()) if p.is_dir() and not p.name.startswith('_')}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build or query the per-brand full-text search index')
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help='Index new/changed pages and drop deleted ones')
+    build.add_argument('--brand', help='Single brand slug (default: all)')
+    q = sub.add_parser('query', help='Search indexed pages')
+    q.add_argument('text', help='Words and/or "quoted phrases"')
+    q.add_argument('--brand', help='Single brand slug (default: all)')
+    q.add_argument('-k', type=int, default=10, help='Number of results')
+    args = parser.parse_args()
+
+    dirs = brand_dirs_under(default_root(), args.brand)
+    if args.command == 'build':
+        for d in dirs.values():
+            update_search_index(d, verbose=True)
+        return
+    started = time.perf_counter()
+    hits = search(dirs, args.text, k=args.k)
+    elapsed = (time.perf_counter() - started) * 1000
+    for hit in hits:
+        print(f"{hit['score']:8.3f}  [{hit['brand']}] {hit['url'] or hit['file']}\n          {hit['snippet']}")
+    print(f"{len(hits)} results in {elapsed:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
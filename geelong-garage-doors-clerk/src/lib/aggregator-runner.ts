@@ -8,6 +8,7 @@ type AggOptions = {
   minWords?: number
   bm25?: string
   bm25Threshold?: number
+  jobs?: number
 }
 
 type AggStatus = {
@@ -49,6 +50,7 @@ class AggregatorRunner {
     if (typeof opts.minWords === 'number') args.push('--minWords', String(opts.minWords))
     if (opts.bm25) args.push('--bm25', opts.bm25)
     if (typeof opts.bm25Threshold === 'number') args.push('--bm25Threshold', String(opts.bm25Threshold))
+    if (typeof opts.jobs === 'number' && opts.jobs > 1) args.push('--jobs', String(opts.jobs))
 
     const logsDir = path.join(cwd, 'logs')
     if (!fs.existsSync(logsDir)) fs.mkdirSync(logsDir, { recursive: true })
@@ -4,40 +4,34 @@ Test script to verify asset extraction from markdown content.
 This helps debug why PDFs and other assets might not be downloaded.
 """
 
-import re
+import sys
 import json
+import time
 from pathlib import Path
+sys.path.append('crawlforai')
+
+from md_links import extract_asset_links
 
 def extract_assets_from_markdown(md_content):
-    """Extract all asset URLs from markdown content"""
-    asset_urls = []
-    
+    """Extract all asset URLs from markdown content (same scanner as the crawler)"""
     try:
-        # Find image markdown: ![alt](url)
-        img_urls = re.findall(r'!\[[^\]]*\]\(([^\)]+)\)', md_content)
-        asset_urls.extend(img_urls)
-        print(f"Found {len(img_urls)} image URLs")
-        
-        # Find PDF links: [text](url.pdf)
-        pdf_urls = re.findall(r'\[[^\]]*\]\(([^\)]*\.pdf[^\)]*)\)', md_content, re.IGNORECASE)
-        asset_urls.extend(pdf_urls)
-        print(f"Found {len(pdf_urls)} PDF URLs")
-        
-        # Find TXT links: [text](url.txt)
-        txt_urls = re.findall(r'\[[^\]]*\]\(([^\)]*\.txt[^\)]*)\)', md_content, re.IGNORECASE)
-        asset_urls.extend(txt_urls)
-        print(f"Found {len(txt_urls)} TXT URLs")
+        links = extract_asset_links(md_content)
+        print(f"Found {len(links['image'])} image URLs")
+        print(f"Found {len(links['pdf'])} PDF URLs")
+        print(f"Found {len(links['txt'])} TXT URLs")
+        print(f"Found {len(links['other'])} other file URLs")
         
         return {
-            'all_assets': asset_urls,
-            'images': img_urls,
-            'pdfs': pdf_urls,
-            'txt_files': txt_urls
+            'all_assets': links['all'],
+            'images': links['image'],
+            'pdfs': links['pdf'],
+            'txt_files': links['txt'],
+            'other_files': links['other']
         }
         
     except Exception as e:
         print(f"Error extracting assets: {e}")
-        return {'all_assets': [], 'images': [], 'pdfs': [], 'txt_files': []}
+        return {'all_assets': [], 'images': [], 'pdfs': [], 'txt_files': [], 'other_files': []}
 
 def test_sample_markdown():
     """Test with sample markdown content"""
@@ -53,6 +47,10 @@ Check the [Installation Guide](https://example.com/guide.pdf) and [Release Notes
 ![Product Image](https://example.com/product.jpg)
 
 [Another PDF](https://example.com/another.PDF) with uppercase extension.
+
+[Press Release](https://example.com/press.pdf "B&D Business Press Release") and [Price List](https://example.com/prices.xlsx).
+
+[![Partner Logo](https://example.com/partner-logo.png)](https://example.com/partners)
 """
     
     print("=== Testing Sample Markdown ===")
@@ -63,6 +61,25 @@ Check the [Installation Guide](https://example.com/guide.pdf) and [Release Notes
     print(f"Images: {results['images']}")
     print(f"PDFs: {results['pdfs']}")
     print(f"TXT files: {results['txt_files']}")
+    print(f"Other files: {results['other_files']}")
+    
+    # Linked images ([![alt](img)](page)) must still be found as images
+    if 'https://example.com/partner-logo.png' in results['images']:
+        print("✅ PASS: linked image extracted")
+    else:
+        print("❌ FAIL: linked image not extracted")
+
+def test_unclosed_brackets_timing():
+    """Unbalanced brackets must not make the scan blow up (it used to be roughly cubic)"""
+    print("\n=== Testing Unclosed Nested Brackets ===")
+    pathological = '[' + '![' * 20000
+    started = time.perf_counter()
+    extract_asset_links(pathological)
+    elapsed = time.perf_counter() - started
+    if elapsed < 1.0:
+        print(f"✅ PASS: 20,000 unclosed image brackets scanned in {elapsed:.3f}s")
+    else:
+        print(f"❌ FAIL: 20,000 unclosed image brackets took {elapsed:.1f}s")
 
 def test_real_markdown_file(file_path):
     """Test with a real markdown file"""
@@ -91,7 +108,7 @@ def test_real_markdown_file(file_path):
         return None
 
 def analyze_existing_assets_json(json_path):
-    """Analyze existing .images.json file to see what was tracked"""
+    """Analyze existing .assets.json / .images.json file to see what was tracked"""
     try:
         with open(json_path, 'r', encoding='utf-8') as f:
             data = json.load(f)
@@ -120,6 +137,7 @@ def analyze_existing_assets_json(json_path):
 if __name__ == "__main__":
     # Test with sample markdown
     test_sample_markdown()
+    test_unclosed_brackets_timing()
     
     # Test with real files if they exist
     base_path = Path("crawlforai/output_markdown/b-and-d")
@@ -131,9 +149,11 @@ if __name__ == "__main__":
         for md_file in md_files:
             results = test_real_markdown_file(md_file)
             
-            # Check corresponding .images.json file
-            json_file = md_file.with_suffix('.images.json')
-            if json_file.exists():
-                analyze_existing_assets_json(json_file)
+            # Check corresponding .assets.json file (.images.json from older --many crawls)
+            for suffix in ('.assets.json', '.images.json'):
+                json_file = md_file.with_suffix(suffix)
+                if json_file.exists():
+                    analyze_existing_assets_json(json_file)
+                    break
     else:
         print(f"\nBase path {base_path} not found. Run this script from the project root.")
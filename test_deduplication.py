@@ -7,33 +7,48 @@ import sys
 import os
 sys.path.append('crawlforai')
 
-from crawl4ai_runner import normalize_url
+from url_canon import normalize_url
 import hashlib
 
+# Pairs of URLs that must normalize to the same value
+NORMALIZATION_CASES = [
+    # Same image with different cache busters
+    ("https://admin.bnd.com.au/media/image.webp?v=123", 
+     "https://admin.bnd.com.au/media/image.webp?v=456"),
+    
+    # Same image with timestamp parameters
+    ("https://admin.bnd.com.au/media/image.webp?timestamp=1234567890", 
+     "https://admin.bnd.com.au/media/image.webp?timestamp=9876543210"),
+    
+    # Same image with cache parameters
+    ("https://admin.bnd.com.au/media/image.webp?cache=abc&width=500", 
+     "https://admin.bnd.com.au/media/image.webp?cache=xyz&width=500"),
+    
+    # Same image with random parameters
+    ("https://admin.bnd.com.au/media/image.webp?_=123&width=500", 
+     "https://admin.bnd.com.au/media/image.webp?_=789&width=500"),
+    
+    # Same image with tracking parameters
+    ("https://admin.bnd.com.au/media/image.webp?utm_source=news&width=500&fbclid=abc", 
+     "https://admin.bnd.com.au/media/image.webp?width=500&gclid=xyz"),
+    
+    # Same image with a differently cased host and reordered parameters
+    ("https://Admin.BND.com.au/media/image.webp?width=500&height=300", 
+     "https://admin.bnd.com.au/media/image.webp?height=300&width=500"),
+]
+
+FILENAME_URLS = [
+    "https://admin.bnd.com.au/media/bd-panelift-seville-monument-double-garage-door.webp?v=123",
+    "https://admin.bnd.com.au/media/bd-panelift-seville-monument-double-garage-door.webp?v=456",
+    "https://admin.bnd.com.au/media/bd-panelift-seville-monument-double-garage-door.webp?timestamp=789",
+]
+
 def test_url_normalization():
     """Test URL normalization for deduplication"""
     
-    test_cases = [
-        # Same image with different cache busters
-        ("https://admin.bnd.com.au/media/image.webp?v=123", 
-         "https://admin.bnd.com.au/media/image.webp?v=456"),
-        
-        # Same image with timestamp parameters
-        ("https://admin.bnd.com.au/media/image.webp?timestamp=1234567890", 
-         "https://admin.bnd.com.au/media/image.webp?timestamp=9876543210"),
-        
-        # Same image with cache parameters
-        ("https://admin.bnd.com.au/media/image.webp?cache=abc&width=500", 
-         "https://admin.bnd.com.au/media/image.webp?cache=xyz&width=500"),
-        
-        # Same image with random parameters
-        ("https://admin.bnd.com.au/media/image.webp?_=123&width=500", 
-         "https://admin.bnd.com.au/media/image.webp?_=789&width=500"),
-    ]
-    
     print("=== URL Normalization Test ===")
     
-    for i, (url1, url2) in enumerate(test_cases, 1):
+    for i, (url1, url2) in enumerate(NORMALIZATION_CASES, 1):
         print(f"\nTest Case {i}:")
         print(f"URL 1: {url1}")
         print(f"URL 2: {url2}")
@@ -61,13 +76,7 @@ def test_filename_generation():
     
     print("\n=== Filename Generation Test ===")
     
-    test_urls = [
-        "https://admin.bnd.com.au/media/bd-panelift-seville-monument-double-garage-door.webp?v=123",
-        "https://admin.bnd.com.au/media/bd-panelift-seville-monument-double-garage-door.webp?v=456",
-        "https://admin.bnd.com.au/media/bd-panelift-seville-monument-double-garage-door.webp?timestamp=789",
-    ]
-    
-    for url in test_urls:
+    for url in FILENAME_URLS:
         normalized = normalize_url(url)
         url_hash = hashlib.md5(normalized.encode()).hexdigest()[:8]
         
@@ -89,6 +98,6 @@ if __name__ == "__main__":
     print("The improved deduplication system now:")
     print("1. ✅ Normalizes URLs by removing dynamic parameters")
     print("2. ✅ Uses normalized URLs for hash generation")
-    print("3. ✅ Performs content-based deduplication as backup")
-    print("4. ✅ Cleans up existing duplicates after crawl")
-    print("5. ✅ Should prevent the duplicate files you observed")
+    print("3. ✅ Performs content-based deduplication as backup (persistent hash index)")
+    print("4. ✅ Should prevent the duplicate files you observed")
+    print("   Duplicates left in older trees: run cleanup_all_brands.py")
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test script for the crawler's streaming sitemap parser.
+Checks that image-sitemap extensions (<image:loc>) are not taken as page URLs.
+"""
+
+import sys
+sys.path.append('crawlforai')
+
+from crawl4ai_runner import SitemapParser
+
+# Yoast/WordPress style: every <url> carries <image:image><image:loc>
+IMAGE_SITEMAP = b"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"
+        xmlns:image="http://www.google.com/schemas/sitemap-image/1.1">
+  <url>
+    <loc>https://x.com/page-a/</loc>
+    <lastmod>2024-05-01T10:00:00+00:00</lastmod>
+    <image:image>
+      <image:loc>https://x.com/wp-content/uploads/a.jpg</image:loc>
+    </image:image>
+  </url>
+  <url>
+    <loc>https://x.com/page-b/</loc>
+  </url>
+</urlset>
+"""
+
+SITEMAP_INDEX = b"""<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <sitemap><loc>https://x.com/page-sitemap.xml</loc><lastmod>2024-05-01</lastmod></sitemap>
+  <sitemap><loc>https://x.com/post-sitemap.xml</loc></sitemap>
+</sitemapindex>
+"""
+
+# No xmlns at all (seen on hand-written sitemaps)
+BARE_SITEMAP = b"<urlset><url><loc>https://x.com/</loc></url></urlset>"
+
+
+def parse(data, chunk_size=17):
+    """Feed the sitemap in small chunks, as the crawler does while downloading"""
+    parser = SitemapParser()
+    for i in range(0, len(data), chunk_size):
+        parser.feed(data[i:i + chunk_size])
+    parser.close()
+    return parser
+
+
+def check(name, got, expected):
+    if got == expected:
+        print(f"✅ PASS: {name}")
+        return True
+    print(f"❌ FAIL: {name}\n   expected: {expected}\n   got:      {got}")
+    return False
+
+
+if __name__ == "__main__":
+    results = [
+        check("image sitemap keeps page URLs",
+              parse(IMAGE_SITEMAP).urls,
+              [('https://x.com/page-a/', '2024-05-01T10:00:00+00:00'), ('https://x.com/page-b/', None)]),
+        check("sitemap index lists child sitemaps",
+              parse(SITEMAP_INDEX).sitemaps,
+              ['https://x.com/page-sitemap.xml', 'https://x.com/post-sitemap.xml']),
+        check("sitemap without namespace",
+              parse(BARE_SITEMAP).urls,
+              [('https://x.com/', None)]),
+    ]
+    sys.exit(0 if all(results) else 1)